@@ -1,35 +1,158 @@
 # api_tool.py
 
-from fastapi import FastAPI, HTTPException, Query
-from pydantic import BaseModel, Field
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from datetime import date
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.gzip import GZipMiddleware
+from typing import Literal
+from pydantic import BaseModel, Field, TypeAdapter
 import uvicorn
-from db_calendar import get_calendar_by_text, get_calendar_by_month
+from db_calendar import (
+    get_calendar_by_text,
+    get_calendar_by_month,
+    get_calendar_between,
+    get_next_race,
+    get_calendar_batch,
+    get_data_version,
+    initialize_db,
+    DEFAULT_SEASON
+)
 
-# Inicializar la base de datos (se asegura de que la tabla exista)
-# Nota: La inicialización se hace ahora dentro de db_calendar.py al importarse.
+# --- HTTP caching configuration ---
+CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", "512"))   # 0 disables the cache (benchmarks)
+CACHE_CONTROL = "public, max-age=300"     # The calendar almost never changes
+DATA_VERSION_CHECK_SECONDS = 2.0          # How often the DB data version is re-read
+MAX_BATCH_QUERIES = 50                    # Sub-queries per batch request (one UNION ALL)
 
 app = FastAPI(
     title="F1 Calendar API Tool",
-    description="API to query the 2026 Formula 1 calendar by GP or month. Designed for LLMs",
+    description="API to query the Formula 1 calendar (2026 season by default) by GP, circuit, month or dates. Designed for LLMs",
     version="1.0.0"
 )
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
+
+# Inicializar la base de datos al arrancar (migraciones y carga de temporadas), no al importar
+@app.on_event("startup")
+def _startup():
+    initialize_db()
 
 
 # --- Definición de Pydantic para la respuesta (Schema) ---
 class CalendarEntry(BaseModel):
+    season: int = Field(..., example=2026)
     gp: str = Field(..., example="Gran Premio de España - Madrid")
     circuito: str = Field(..., example="Circuito urbano de Madrid (Madring)")
     desde: str = Field(..., example="11/09/2026")
     hasta: str = Field(..., example="13/09/2026")
 
 
+class CalendarSubQuery(BaseModel):
+    gp_name: str | None = Field(None, description="Partial name of the Grand Prix ('Barcelona', 'Bahrain').")
+    circuit_name: str | None = Field(None, description="Partial name of the circuit ('Monza').")
+    month_name: str | None = Field(None, description="Full name of the month in English ('June').")
+    date_from: date | None = Field(None, description="Start of a date range, YYYY-MM-DD.")
+    date_to: date | None = Field(None, description="End of a date range, YYYY-MM-DD.")
+    season: int | None = Field(DEFAULT_SEASON, description="Season year; always restricts the results. Null for all seasons.")
+    combine: Literal["and", "or"] = Field("and", description="How the gp/circuit/month/date filters are combined.")
+
+
+class CalendarBatchRequest(BaseModel):
+    queries: list[CalendarSubQuery] = Field(..., min_length=1, max_length=MAX_BATCH_QUERIES)
+
+
+class CalendarBatchResult(BaseModel):
+    query_index: int = Field(..., example=0)
+    results: list[CalendarEntry]
+
+
+_entries_adapter = TypeAdapter(list[CalendarEntry])
+
+
+def _serialize_entries(results: list[dict]) -> bytes:
+    """JSON body of a list of calendar rows (validated first: the adapter serializes models, not dicts)."""
+    return _entries_adapter.dump_json(_entries_adapter.validate_python(results))
+
+
+class _ResponseCache:
+    """
+    In-process cache of serialized responses keyed by the normalized query parameters.
+    It is emptied when the calendar data version changes (a season was loaded).
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self._entries = OrderedDict()
+        self._max_entries = max_entries
+        self._data_version = None
+        self._checked_at = 0.0
+
+    def fresh_data_version(self) -> int | None:
+        """Known data version, or None if it must be read again (every DATA_VERSION_CHECK_SECONDS)."""
+        if self._data_version is None or time.monotonic() - self._checked_at > DATA_VERSION_CHECK_SECONDS:
+            return None
+        return self._data_version
+
+    def set_data_version(self, version: int) -> int:
+        """Store the version just read (on the event loop, like get/put); a new one empties the cache."""
+        if version != self._data_version:
+            self._entries.clear()
+            self._data_version = version
+        self._checked_at = time.monotonic()
+        return version
+
+    def get(self, key: tuple):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple, entry: tuple):
+        self._entries[key] = entry
+        if len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+
+_cache = _ResponseCache()
+
+
+def _normalize(value):
+    """Cache key part: strings are case/space-insensitive, dates in ISO format."""
+    if isinstance(value, str):
+        return " ".join(value.lower().split()) or None
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _run_calendar_query(gp_name, circuit_name, month_name, date_from, date_to, after_date, season) -> list[dict]:
+    """Apply the filter with the highest priority (GP > Circuit > Month > Date range > Next race)."""
+    if gp_name:
+        return get_calendar_by_text(gp_name, 'gp', season)
+    elif circuit_name:
+        return get_calendar_by_text(circuit_name, 'circuito', season)
+    elif month_name:
+        return get_calendar_by_month(month_name, season)
+    elif date_from or date_to:
+        # A range with only one end is open on the other side
+        return get_calendar_between(date_from or date.min, date_to or date.max)
+    elif after_date:
+        return get_next_race(after_date)
+    # Without filters, return everything (using an empty GP query to return everything)
+    return get_calendar_by_text(search_text='', column_name='gp', season=season)
+
+
 # --- API definition for LLM Tool function ---
 @app.get(
     "/calendar/query",
     response_model=list[CalendarEntry],
-    summary="Get the 2026 F1 calendar, filtering by GP, Circuit or Month."
+    summary="Get the 2026 F1 calendar, filtering by GP, Circuit, Month, date range or next race after a date."
 )
-def query_f1_calendar(
+async def query_f1_calendar(
+    request: Request,
     # --- CORRECCIÓN AQUÍ: Usar Query(default=None, description=...) ---
     gp_name: str | None = Query(
         None,
@@ -42,36 +165,85 @@ def query_f1_calendar(
     month_name: str | None = Query(
         None,
         description="The full name of the month ('June')."
+    ),
+    date_from: date | None = Query(
+        None,
+        description="Start of a date range, ISO format YYYY-MM-DD ('2026-06-01'). Use with date_to."
+    ),
+    date_to: date | None = Query(
+        None,
+        description="End of a date range, ISO format YYYY-MM-DD ('2026-06-30'). Use with date_from."
+    ),
+    after_date: date | None = Query(
+        None,
+        description="Return only the next race starting after this date, ISO format YYYY-MM-DD ('2026-07-10')."
+    ),
+    season: int = Query(
+        DEFAULT_SEASON,
+        description="Season year used by the GP, circuit and month filters (2026)."
     )
 ):
     """
-    Search for Grand Prix races by Grand Prix name, circuit, or month.
-    Priority: GP > Circuit > Month.
+    Search for Grand Prix races by Grand Prix name, circuit, month, date range or next race.
+    Priority: GP > Circuit > Month > Date range > Next race.
     If all parameters are null, return the entire calendar.
 
     :return: A list of JSON objects containing the calendar information.
     """
 
-    if gp_name:        
-        results = get_calendar_by_text(gp_name, 'gp')
-    elif circuit_name:        
-        results = get_calendar_by_text(circuit_name, 'circuito')
-    elif month_name:        
-        results = get_calendar_by_month(month_name)
-    else:
-        # Without filters, return everything (using an empty GP query to return everything)
-        results = get_calendar_by_text(search_text='', column_name='gp')
+    params = (gp_name, circuit_name, month_name, date_from, date_to, after_date, season)
+    data_version = _cache.fresh_data_version()
+    if data_version is None:
+        # Single-row read (plus the lazy DB initialization on first use) in the thread pool too
+        data_version = _cache.set_data_version(await run_in_threadpool(get_data_version))
+    key = (data_version, *(_normalize(value) for value in params))
 
-    if not results:
+    entry = _cache.get(key)
+    if entry is None:
+        # Cache miss: SQLite work runs in the thread pool so the event loop is never blocked
+        results = await run_in_threadpool(_run_calendar_query, *params)
+        body = _serialize_entries(results) if results else None
+        etag = f'W/"{hashlib.sha1(body).hexdigest()}"' if body else None
+        entry = (body, etag)
+        _cache.put(key, entry)
+
+    body, etag = entry
+    if body is None:
         # Retorna una estructura vacía si no se encuentra nada
         raise HTTPException(
             status_code=404,
             detail="No Grand Prix was found that matches the specified name, circuit, or month."
         )
 
-    return results
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.post(
+    "/calendar/batch",
+    response_model=list[CalendarBatchResult],
+    summary="Answer several F1 calendar sub-queries at once, each combining GP, circuit, month, date range and season filters with AND/OR."
+)
+async def query_f1_calendar_batch(batch: CalendarBatchRequest):
+    """
+    Compound calendar query: every sub-query is answered in the same SQL round-trip.
+    A sub-query without matches returns an empty 'results' list (no 404).
+
+    :return: One entry per sub-query, in the request order.
+    """
+    sub_queries = [query.model_dump() for query in batch.queries]
+    results = await run_in_threadpool(get_calendar_batch, sub_queries)
+    return [{"query_index": index, "results": entries} for index, entries in enumerate(results)]
 
 
 if __name__ == "__main__":
-    print(f"API launched. Access the documentation at: http://127.0.0.1:8000/docs")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # API_WORKERS > 1 starts several processes (each one with its own cache and SQLite connections)
+    workers = int(os.getenv("API_WORKERS", "1"))
+    print(f"API launched with {workers} worker(s). Access the documentation at: http://127.0.0.1:8000/docs")
+    if workers > 1:
+        uvicorn.run("api_tool:app", host="0.0.0.0", port=8000, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -9,12 +9,22 @@ import streamlit as st
 from dotenv import load_dotenv
 load_dotenv()
 
+from rag import warmup
+
+
+@st.cache_resource
+def start_warmup():
+    """Load the embedding model and FAISS in the background, once per process."""
+    return warmup()
+
 st.set_page_config(
     page_title="🏎️ Home F1 AI",
     layout="wide",
     initial_sidebar_state="expanded"
 )
 
+start_warmup()
+
 st.title("🏎️ Welcome to the Generative F1 App (Prototype)")
 st.markdown("---")
 
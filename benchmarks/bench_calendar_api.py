@@ -0,0 +1,165 @@
+# benchmarks/bench_calendar_api.py
+"""
+Load benchmark of the calendar API (api_tool.app).
+
+Drives the ASGI app in-process (httpx ASGITransport) and/or a local uvicorn instance
+at several concurrency levels over the /calendar/query parameter mix, and reports
+requests/sec and p50/p99 latency, plus how much of a request goes to SQLite
+versus JSON serialization.
+
+Usage (from the repository root, needs 'pip install httpx'):
+    python benchmarks/bench_calendar_api.py --requests 2000 --concurrency 1,8,32
+    python benchmarks/bench_calendar_api.py --mode uvicorn --workers 4 --no-cache
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date
+
+import httpx
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)   # f1_data.db and calendar_data/ are relative to the repository root
+
+# (name, query parameters, expected HTTP status)
+QUERY_MIX = [
+    ("gp", {"gp_name": "Barcelona"}, 200),
+    ("gp_alias", {"gp_name": "Bahrain"}, 200),
+    ("circuit", {"circuit_name": "Monza"}, 200),
+    ("month", {"month_name": "June"}, 200),
+    ("date_range", {"date_from": "2026-06-01", "date_to": "2026-07-31"}, 200),
+    ("next_race", {"after_date": "2026-07-10"}, 200),
+    ("empty", {}, 200),
+    ("gp_404", {"gp_name": "Atlantis"}, 404),
+    ("month_404", {"month_name": "Smarch"}, 404),
+]
+ENDPOINT = "/calendar/query"
+
+
+def _percentile(samples: list[float], pct: int) -> float:
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100)[pct - 1]
+
+
+async def _run_load(client: httpx.AsyncClient, total_requests: int, concurrency: int) -> dict:
+    """Send total_requests over the query mix with 'concurrency' requests in flight."""
+    latencies = {name: [] for name, _, _ in QUERY_MIX}
+    errors = 0
+    counter = iter(range(total_requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            name, params, expected = QUERY_MIX[i % len(QUERY_MIX)]
+            start = time.perf_counter()
+            response = await client.get(ENDPOINT, params=params)
+            latencies[name].append(time.perf_counter() - start)
+            if response.status_code != expected:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {"elapsed": elapsed, "latencies": latencies, "errors": errors}
+
+
+def _report(label: str, total_requests: int, concurrency: int, result: dict):
+    all_latencies = [value for values in result["latencies"].values() for value in values]
+    print(f"\n[{label}] concurrency={concurrency}: {total_requests / result['elapsed']:.0f} req/s, "
+          f"p50={1000 * _percentile(all_latencies, 50):.2f} ms, p99={1000 * _percentile(all_latencies, 99):.2f} ms, "
+          f"errors={result['errors']}")
+    for name, values in result["latencies"].items():
+        print(f"    {name:<11} p50={1000 * _percentile(values, 50):7.2f} ms  p99={1000 * _percentile(values, 99):7.2f} ms")
+
+
+async def bench_inprocess(total_requests: int, levels: list[int]):
+    from api_tool import app
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await _run_load(client, len(QUERY_MIX), 1)   # Warm-up (connections, first queries)
+        for concurrency in levels:
+            _report("in-process ASGI", total_requests, concurrency, await _run_load(client, total_requests, concurrency))
+
+
+async def bench_uvicorn(total_requests: int, levels: list[int], workers: int, port: int):
+    command = [sys.executable, "-m", "uvicorn", "api_tool:app", "--port", str(port),
+               "--workers", str(workers), "--log-level", "warning"]
+    server = subprocess.Popen(command, env=os.environ.copy())
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=httpx.Limits(max_connections=max(levels))) as client:
+            for _ in range(100):   # Wait until the server accepts connections
+                try:
+                    await client.get("/openapi.json")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            await _run_load(client, len(QUERY_MIX), 1)
+            for concurrency in levels:
+                _report(f"uvicorn x{workers}", total_requests, concurrency, await _run_load(client, total_requests, concurrency))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def bench_breakdown(iterations: int):
+    """Time of the SQLite query versus JSON serialization for every case of the mix."""
+    from api_tool import _run_calendar_query, _serialize_entries
+
+    print(f"\n[breakdown] mean per request over {iterations} iterations (no HTTP, no cache)")
+    for name, params, _ in QUERY_MIX:
+        args = [params.get(key) for key in ("gp_name", "circuit_name", "month_name")]
+        dates = [params.get(key) for key in ("date_from", "date_to", "after_date")]
+        args += [None if value is None else date.fromisoformat(value) for value in dates]
+        args.append(2026)
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            results = _run_calendar_query(*args)
+        sqlite_time = (time.perf_counter() - start) / iterations
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            _serialize_entries(results)
+        serialization_time = (time.perf_counter() - start) / iterations
+
+        total = sqlite_time + serialization_time
+        print(f"    {name:<11} sqlite={1e6 * sqlite_time:8.1f} us  serialization={1e6 * serialization_time:8.1f} us  "
+              f"({100 * sqlite_time / total:.0f}% sqlite)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calendar API load benchmark.")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per concurrency level.")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels.")
+    parser.add_argument("--mode", default="inprocess,uvicorn", help="inprocess, uvicorn or both (comma-separated).")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--no-cache", action="store_true", help="Disable the API response cache.")
+    parser.add_argument("--breakdown-iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    if args.no_cache:
+        os.environ["API_CACHE_MAX_ENTRIES"] = "0"   # Read by api_tool at import (also by the uvicorn subprocess)
+    levels = [int(level) for level in args.concurrency.split(",")]
+    modes = args.mode.split(",")
+
+    from db_calendar import initialize_db
+    initialize_db()
+
+    if "inprocess" in modes:
+        asyncio.run(bench_inprocess(args.requests, levels))
+    if "uvicorn" in modes:
+        asyncio.run(bench_uvicorn(args.requests, levels, args.workers, args.port))
+    bench_breakdown(args.breakdown_iterations)
+
+
+if __name__ == "__main__":
+    main()
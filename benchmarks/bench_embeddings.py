@@ -0,0 +1,146 @@
+# benchmarks/bench_embeddings.py
+"""
+Embedding backend benchmark and validation (llm_client.EMBEDDING_BACKENDS).
+
+For every backend it reports the model load time, the ingest throughput (embed_documents
+in batches) and the single-query latency. Every backend is also compared with the
+reference (PyTorch) model: cosine drift of each vector and overlap of the top-k neighbours,
+so an index built with one backend can be queried with another. The script exits with
+code 1 if a backend drifts more than --max-drift.
+
+Usage (from the repository root; onnx backends need 'pip install sentence-transformers[onnx]'):
+    python benchmarks/bench_embeddings.py
+    python benchmarks/bench_embeddings.py --backends onnx-int8 --validate-only --max-drift 0.02
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from llm_client import EMBEDDING_BACKENDS, make_embedding_function   # noqa: E402
+from news_source_config import F1_REFERENCE_TEXTS                     # noqa: E402
+
+REFERENCE_BACKEND = "torch"
+TOP_K = 3
+
+# Short texts similar to the indexed summaries and to the user questions
+SAMPLE_TEXTS = F1_REFERENCE_TEXTS + [
+    "Hamilton says Ferrari's new power unit is a step forward for the 2026 regulations.",
+    "Verstappen takes pole position in Bahrain after a late lap in the final qualifying session.",
+    "Alonso y Aston Martin confían en el motor Honda para la temporada 2026.",
+    "McLaren brings a new floor upgrade to Barcelona to fight Red Bull for the championship.",
+    "Colapinto completa su primer test con Alpine en el circuito de Silverstone.",
+    "Mercedes confirms Russell and Antonelli as its driver line-up for next season.",
+    "The FIA announces changes to the pit stop rules after the incident in Monaco.",
+    "Leclerc abandona en Monza por un problema de caja de cambios.",
+    "Sainz explains Williams' strategy after finishing in the points in Singapore.",
+    "Pirelli will bring its softest compounds to the Madrid street circuit.",
+]
+SAMPLE_QUERIES = [
+    "What has Hamilton said about Ferrari's engine?",
+    "¿Quién hizo la pole en Bahrein?",
+    "McLaren upgrades",
+    "Alpine test driver",
+    "pit stop rules",
+]
+
+
+def _normalize(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _top_k(query_vectors: np.ndarray, doc_vectors: np.ndarray) -> list[set]:
+    scores = query_vectors @ doc_vectors.T
+    return [set(np.argsort(-row)[:TOP_K]) for row in scores]
+
+
+def bench_backend(backend: str, texts: list[str], batch_size: int, query_repeats: int) -> dict:
+    start = time.perf_counter()
+    embeddings = make_embedding_function(backend)
+    embeddings.embed_query("warmup")   # First call includes lazy session/graph initialization
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    doc_vectors = []
+    for i in range(0, len(texts), batch_size):
+        doc_vectors.extend(embeddings.embed_documents(texts[i:i + batch_size]))
+    ingest_seconds = time.perf_counter() - start
+
+    query_latencies = []
+    query_vectors = []
+    for i in range(query_repeats):
+        query = SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)]
+        start = time.perf_counter()
+        vector = embeddings.embed_query(query)
+        query_latencies.append(time.perf_counter() - start)
+        if i < len(SAMPLE_QUERIES):
+            query_vectors.append(vector)
+
+    return {
+        "load_seconds": load_seconds,
+        "docs_per_second": len(texts) / ingest_seconds,
+        "query_p50_ms": 1000 * statistics.median(query_latencies),
+        "doc_vectors": _normalize(doc_vectors),
+        "query_vectors": _normalize(query_vectors),
+    }
+
+
+def cosine_drift(result: dict, reference: dict) -> dict:
+    """1 - cosine similarity of each vector against the reference, and top-k neighbour overlap."""
+    unique = len(SAMPLE_TEXTS)   # The ingest corpus repeats the samples; ties would blur the top-k
+    doc_vectors, reference_docs = result["doc_vectors"][:unique], reference["doc_vectors"][:unique]
+    drift = 1 - np.sum(doc_vectors * reference_docs, axis=1)
+    neighbours = _top_k(result["query_vectors"], doc_vectors)
+    reference_neighbours = _top_k(reference["query_vectors"], reference_docs)
+    overlap = [len(a & b) / TOP_K for a, b in zip(neighbours, reference_neighbours)]
+    return {"mean": float(drift.mean()), "max": float(drift.max()), "top_k_overlap": float(np.mean(overlap))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding backend benchmark and drift validation.")
+    parser.add_argument("--backends", default=",".join(EMBEDDING_BACKENDS),
+                        help="Comma-separated backends to compare with the reference.")
+    parser.add_argument("--texts", type=int, default=2000, help="Texts embedded in the ingest test.")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--queries", type=int, default=200, help="Single-query embeddings for the latency test.")
+    parser.add_argument("--max-drift", type=float, default=0.02, help="Max allowed 1 - cosine per vector.")
+    parser.add_argument("--validate-only", action="store_true", help="Skip the throughput test (small corpus).")
+    args = parser.parse_args()
+
+    total = len(SAMPLE_TEXTS) if args.validate_only else args.texts
+    texts = [SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)] for i in range(total)]
+    queries = len(SAMPLE_QUERIES) if args.validate_only else max(args.queries, len(SAMPLE_QUERIES))
+    backends = [REFERENCE_BACKEND] + [b for b in args.backends.split(",") if b != REFERENCE_BACKEND]
+
+    results = {}
+    failed = False
+    for backend in backends:
+        try:
+            results[backend] = result = bench_backend(backend, texts, args.batch_size, queries)
+        except Exception as e:
+            print(f"{backend:<10} FAILED to load: {e}")
+            failed = True
+            continue
+        line = (f"{backend:<10} load {result['load_seconds']:6.2f} s | ingest {result['docs_per_second']:7.0f} docs/s | "
+                f"query p50 {result['query_p50_ms']:6.2f} ms")
+        if backend != REFERENCE_BACKEND and REFERENCE_BACKEND in results:
+            drift = cosine_drift(result, results[REFERENCE_BACKEND])
+            ok = drift["max"] <= args.max_drift
+            failed = failed or not ok
+            line += (f" | drift mean {drift['mean']:.5f} max {drift['max']:.5f} "
+                     f"top-{TOP_K} overlap {100 * drift['top_k_overlap']:.0f}% {'OK' if ok else 'TOO HIGH'}")
+        print(line)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/bench_startup.py
+"""
+Startup (import time) benchmark of the app modules.
+
+Runs 'python -X importtime -c "import <module>"' in a fresh interpreter per module and
+reports the total import time plus the slowest imported packages, to check that heavy
+dependencies (google-genai, LangChain/FAISS, sentence-transformers) stay out of the
+import path and are only loaded on first use.
+
+Usage (from the repository root):
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --modules rag,api_tool --top 15
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = ["llm_client", "summarizer", "rag", "db_calendar", "api_tool", "scraper", "pipeline"]
+
+
+def import_profile(module: str) -> tuple[float, list[tuple[int, str]]]:
+    """
+    Import the module in a new interpreter with -X importtime.
+    Returns (wall seconds, [(cumulative microseconds, top-level package)]).
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    # Lines look like: "import time:   self [us] | cumulative | imported package"
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith(" " * 2):   # Only first-level imports (no indentation)
+            name = name.strip()
+            packages[name] = max(packages.get(name, 0), int(cumulative))
+    ranking = sorted(((us, name) for name, us in packages.items()), reverse=True)
+    return elapsed, ranking
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time benchmark of the app modules.")
+    parser.add_argument("--modules", default=",".join(DEFAULT_MODULES),
+                        help="Comma-separated module names to import.")
+    parser.add_argument("--top", type=int, default=8, help="Slowest packages to show per module.")
+    args = parser.parse_args()
+
+    for module in args.modules.split(","):
+        try:
+            elapsed, ranking = import_profile(module)
+        except RuntimeError as e:
+            print(f"{module:<14} FAILED: {e}")
+            continue
+        print(f"{module:<14} {elapsed * 1000:8.0f} ms wall")
+        for us, name in ranking[:args.top]:
+            print(f"    {us / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
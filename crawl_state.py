@@ -0,0 +1,152 @@
+# crawl_state.py
+
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+
+CRAWL_DB_NAME = "f1_crawl_state.db"
+TABLE_NAME = "crawl_urls"
+LINKS_TABLE_NAME = "listing_links"
+
+# --- URL status values ---
+STATUS_INDEXED = "indexed"        # Summarized and sent to FAISS
+STATUS_TOO_OLD = "too_old"        # Discarded by the date filter (re-checked if min_date moves back)
+STATUS_DISCARDED = "discarded"    # Empty/short text or duplicated content
+STATUS_ERROR = "error"            # Download/parse failure, retried on the next crawl
+STATUS_LISTING = "listing"        # Index (listing) page of a source
+
+# Statuses that will never be downloaded again
+FINAL_STATUSES = (STATUS_INDEXED, STATUS_DISCARDED)
+
+
+def content_hash(html: str) -> str:
+    """SHA-256 of the downloaded HTML, used to detect unchanged pages and duplicated articles."""
+    return hashlib.sha256((html or "").encode("utf-8", errors="ignore")).hexdigest()
+
+
+class CrawlState:
+    """
+    Persistent crawl frontier (SQLite).
+    Keeps per URL: status, last fetch time, ETag/Last-Modified, content hash and publication date.
+    Thread-safe: a single connection protected by a lock.
+    """
+
+    def __init__(self, db_path: str = CRAWL_DB_NAME):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+                url TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                last_fetch TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                published_at TEXT
+            )
+        """)
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{TABLE_NAME}_hash ON {TABLE_NAME} (content_hash)")
+        # Candidate links of the last parsed listing page of each source (in page order),
+        # re-checked when the listing page has not changed
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {LINKS_TABLE_NAME} (
+                source_url TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                title TEXT,
+                PRIMARY KEY (source_url, position)
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, url: str) -> dict | None:
+        """Return the stored state of a URL or None if it was never fetched."""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"SELECT url, status, last_fetch, etag, last_modified, content_hash, published_at "
+                f"FROM {TABLE_NAME} WHERE url = ?", (url,)
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        columns = [col[0] for col in cursor.description]
+        return dict(zip(columns, row))
+
+    def should_skip(self, url: str, min_date: datetime) -> bool:
+        """
+        True if the article was already processed: indexed, discarded, or too old
+        for the requested minimum date.
+        """
+        entry = self.get(url)
+        if entry is None:
+            return False
+        if entry["status"] in FINAL_STATUSES:
+            return True
+        if entry["status"] == STATUS_TOO_OLD and entry["published_at"]:
+            return datetime.fromisoformat(entry["published_at"]) < min_date
+        return False
+
+    def is_duplicate(self, url: str, html_hash: str) -> bool:
+        """True if the same content was already indexed under another URL."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT 1 FROM {TABLE_NAME} WHERE content_hash = ? AND url != ? AND status = ? LIMIT 1",
+                (html_hash, url, STATUS_INDEXED)
+            ).fetchone()
+        return row is not None
+
+    def conditional_headers(self, url: str) -> dict:
+        """Build If-None-Match / If-Modified-Since headers from the last fetch of the URL."""
+        entry = self.get(url)
+        headers = {}
+        if entry:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record(self, url: str, status: str, etag: str | None = None, last_modified: str | None = None,
+               html_hash: str | None = None, published_at: datetime | None = None):
+        """Insert or update the state of a URL."""
+        with self._lock:
+            self._conn.execute(f"""
+                INSERT INTO {TABLE_NAME} (url, status, last_fetch, etag, last_modified, content_hash, published_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    status = excluded.status,
+                    last_fetch = excluded.last_fetch,
+                    etag = COALESCE(excluded.etag, etag),
+                    last_modified = COALESCE(excluded.last_modified, last_modified),
+                    content_hash = COALESCE(excluded.content_hash, content_hash),
+                    published_at = COALESCE(excluded.published_at, published_at)
+            """, (
+                url, status, datetime.utcnow().isoformat(timespec="seconds"), etag, last_modified,
+                html_hash, published_at.isoformat() if published_at else None
+            ))
+            self._conn.commit()
+
+    def save_listing_links(self, source_url: str, links: list[tuple[str, str]]):
+        """Replace the stored candidate links (url, title) of a source listing page."""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {LINKS_TABLE_NAME} WHERE source_url = ?", (source_url,))
+            self._conn.executemany(
+                f"INSERT INTO {LINKS_TABLE_NAME} (source_url, position, url, title) VALUES (?, ?, ?, ?)",
+                [(source_url, position, url, title) for position, (url, title) in enumerate(links)]
+            )
+            self._conn.commit()
+
+    def listing_links(self, source_url: str) -> list[tuple[str, str]]:
+        """Candidate links (url, title) stored for a source, in page order."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT url, title FROM {LINKS_TABLE_NAME} WHERE source_url = ? ORDER BY position", (source_url,)
+            ).fetchall()
+        return [(url, title or "") for url, title in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
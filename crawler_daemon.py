@@ -0,0 +1,127 @@
+# crawler_daemon.py
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+STATUS_PATH = "crawler_status.json"
+TRIGGER_PATH = "crawler_trigger.json"     # Written by the Streamlit page to request a crawl now
+MAX_STATUS_EVENTS = 100                   # Last events kept in the status file
+DEFAULT_INTERVAL_MINUTES = 60
+DEFAULT_LOOKBACK_DAYS = 7
+
+
+def write_status(status: dict):
+    """Write the status file atomically (readers never see a half-written JSON)."""
+    tmp_path = f"{STATUS_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(status, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp_path, STATUS_PATH)
+
+
+def read_status() -> dict | None:
+    """Read the crawler status file (used by the Streamlit pages). None if the daemon never ran."""
+    try:
+        with open(STATUS_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def request_crawl(start_date: datetime):
+    """Ask the running daemon to start a crawl now from start_date (does not touch the index)."""
+    with open(TRIGGER_PATH, "w", encoding="utf-8") as f:
+        json.dump({"start_date": start_date.isoformat(), "requested_at": datetime.now().isoformat()}, f)
+
+
+def _pop_trigger() -> datetime | None:
+    """Consume a pending crawl request, returning its start date."""
+    try:
+        with open(TRIGGER_PATH, encoding="utf-8") as f:
+            request = json.load(f)
+        os.remove(TRIGGER_PATH)
+        return datetime.fromisoformat(request["start_date"])
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+
+def run_crawl(start_date: datetime, status: dict) -> dict:
+    """
+    One incremental crawl: runs the streaming pipeline (which takes the index write lock
+    for each indexed micro-batch) and updates the status file with every event.
+    """
+    # Heavy imports only when a crawl actually runs
+    from pipeline import run_news_pipeline
+    from rag import load_vector_store
+
+    status.update({
+        "state": "running",
+        "pid": os.getpid(),
+        "start_date": start_date.isoformat(),
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "finished_at": None,
+        "indexed": 0,
+        "indexed_items": [],
+        "events": [],
+        "last_error": None,
+    })
+    write_status(status)
+
+    try:
+        for msg_type, content in run_news_pipeline(start_date, add_mock=False):
+            if msg_type == 'indexed':
+                status["indexed"] += 1
+                status["indexed_items"].append(content)
+            else:
+                status["events"] = (status["events"] + [[msg_type, content]])[-MAX_STATUS_EVENTS:]
+            write_status(status)
+        vector_store, _ = load_vector_store()
+        status["db_size"] = vector_store.ntotal
+        status["index_version"] = vector_store.version
+        status["state"] = "idle"
+    except Exception as e:
+        status["state"] = "error"
+        status["last_error"] = str(e)
+
+    status["finished_at"] = datetime.now().isoformat(timespec="seconds")
+    write_status(status)
+    print(f"[{status['finished_at']}] Crawl {status['state']}: {status['indexed']} articles indexed.")
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless F1 news crawler (scrape -> summarize -> FAISS).")
+    parser.add_argument("--once", action="store_true", help="Run a single crawl and exit.")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL_MINUTES,
+                        help="Minutes between scheduled incremental crawls.")
+    parser.add_argument("--days", type=int, default=DEFAULT_LOOKBACK_DAYS,
+                        help="Only index articles published in the last N days.")
+    args = parser.parse_args()
+
+    load_dotenv()
+    status = read_status() or {}
+
+    while True:
+        start_date = datetime.today() - timedelta(days=args.days)
+        status = run_crawl(start_date, status)
+        if args.once:
+            break
+
+        next_run = time.time() + args.interval * 60
+        status["next_run_at"] = datetime.fromtimestamp(next_run).isoformat(timespec="seconds")
+        write_status(status)
+
+        # Sleep until the next scheduled run, waking up early if the UI requests a crawl
+        while time.time() < next_run:
+            requested_start = _pop_trigger()
+            if requested_start:
+                status = run_crawl(requested_start, status)
+            time.sleep(5)
+
+
+if __name__ == "__main__":
+    main()
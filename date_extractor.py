@@ -0,0 +1,156 @@
+# date_extractor.py
+
+import json
+import threading
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from lxml import etree
+from lxml.cssselect import CSSSelector
+
+from news_source_config import UTC
+
+# -------------------------------------------------------------------
+# Precompiled XPath expressions (compiled once at import, reused for every article)
+# -------------------------------------------------------------------
+META_DATE_XPATH = etree.XPath(
+    "//meta[@property='article:published_time' or @property='og:published_time'"
+    " or @property='og:article:published_time' or @itemprop='datePublished'"
+    " or @name='pubdate' or @name='publishdate' or @name='publish-date' or @name='date'"
+    " or @name='dc.date' or @name='DC.date.issued' or @name='sailthru.date'"
+    " or @name='parsely-pub-date']/@content"
+)
+JSON_LD_XPATH = etree.XPath("//script[@type='application/ld+json']/text()")
+TIME_DATETIME_XPATH = etree.XPath("//time[@datetime]/@datetime")
+
+
+@lru_cache(maxsize=64)
+def _compiled_selector(css_selector: str) -> CSSSelector:
+    """Compile the CSS selector of a source only once."""
+    return CSSSelector(css_selector)
+
+
+def _localize(dt_object: datetime) -> datetime:
+    """Return a datetime 'aware' object (UTC if the string had no timezone)."""
+    if dt_object.tzinfo is None or dt_object.tzinfo.utcoffset(dt_object) is None:
+        return UTC.localize(dt_object)
+    return dt_object
+
+
+def _parse_iso(date_str: str) -> datetime | None:
+    """Parse ISO 8601 strings (with 'Z' or offset) used by meta tags, JSON-LD and <time>."""
+    try:
+        return _localize(datetime.fromisoformat(date_str.strip().replace('Z', '+00:00')))
+    except (ValueError, AttributeError):
+        return None
+
+
+def _from_config_selector(doc, config: dict) -> datetime | None:
+    """1. Selector, attribute and format configured for the source."""
+    if not config.get("date_selector"):
+        return None
+    for tag in _compiled_selector(config["date_selector"])(doc):
+        date_str = tag.get(config["date_attribute"]) if config.get("date_attribute") else tag.text_content()
+        if not date_str:
+            continue
+        try:
+            return _localize(datetime.strptime(date_str.strip(), config["date_format"]))
+        except ValueError:
+            parsed = _parse_iso(date_str)
+            if parsed:
+                return parsed
+    return None
+
+
+def _from_meta(doc, config: dict) -> datetime | None:
+    """2. Standard <meta> publication tags (Open Graph, Dublin Core, schema.org...)."""
+    for value in META_DATE_XPATH(doc):
+        parsed = _parse_iso(value)
+        if parsed:
+            return parsed
+    return None
+
+
+def _find_date_published(node) -> str | None:
+    """Search 'datePublished' recursively in a JSON-LD object (it can be nested in @graph or lists)."""
+    if isinstance(node, dict):
+        if isinstance(node.get("datePublished"), str):
+            return node["datePublished"]
+        node = list(node.values())
+    if isinstance(node, list):
+        for item in node:
+            found = _find_date_published(item)
+            if found:
+                return found
+    return None
+
+
+def _from_json_ld(doc, config: dict) -> datetime | None:
+    """3. schema.org JSON-LD blocks."""
+    for script_text in JSON_LD_XPATH(doc):
+        try:
+            date_str = _find_date_published(json.loads(script_text))
+        except ValueError:
+            continue
+        parsed = _parse_iso(date_str) if date_str else None
+        if parsed:
+            return parsed
+    return None
+
+
+def _from_time_tag(doc, config: dict) -> datetime | None:
+    """4. First <time datetime="..."> of the page."""
+    for value in TIME_DATETIME_XPATH(doc):
+        parsed = _parse_iso(value)
+        if parsed:
+            return parsed
+    return None
+
+
+# Cascade order: stops at the first extractor that returns a date
+DATE_EXTRACTORS = [
+    ("selector", _from_config_selector),
+    ("meta", _from_meta),
+    ("json_ld", _from_json_ld),
+    ("time", _from_time_tag),
+]
+
+
+def extract_date_from_doc(doc, config: dict) -> tuple[datetime | None, str | None]:
+    """
+    Run the date extraction cascade over an already parsed lxml DOM.
+    Returns (datetime 'aware' or None, name of the extractor that found it).
+    """
+    if doc is None:
+        return None, None
+    for name, extractor in DATE_EXTRACTORS:
+        dt_object = extractor(doc, config)
+        if dt_object:
+            return dt_object, name
+    return None, None
+
+
+class ParseStats:
+    """Per-crawl metrics: article parse time and date extraction hit rate."""
+
+    def __init__(self):
+        self.articles = 0
+        self.parse_seconds = 0.0
+        self.date_hits = Counter()
+        self._lock = threading.Lock()   # Sources are parsed from several threads
+
+    def add(self, parse_seconds: float, extractor_name: str | None):
+        with self._lock:
+            self.articles += 1
+            self.parse_seconds += parse_seconds
+            self.date_hits[extractor_name or "miss"] += 1
+
+    def summary(self) -> str:
+        if not self.articles:
+            return "No articles parsed."
+        hits = self.articles - self.date_hits["miss"]
+        by_extractor = ", ".join(f"{name}: {count}" for name, count in self.date_hits.most_common())
+        return (
+            f"Parsed {self.articles} articles, avg parse time {1000 * self.parse_seconds / self.articles:.1f} ms. "
+            f"Date hit rate {100 * hits / self.articles:.0f}% ({by_extractor})."
+        )
@@ -1,38 +1,24 @@
 # db_calendar.py
 
 import sqlite3
+import csv
 import json
-from datetime import datetime
+import os
+import re
+import sys
+import threading
+from datetime import date, datetime
 
 DB_NAME = "f1_data.db"
-TABLE_NAME = "calendario_2026"
-
-CALENDAR_DATA = [
-  {"desde": "06/03/2026", "hasta": "08/03/2026", "GP": "Australia", "circuito": "Albert Park"},
-  {"desde": "13/03/2026", "hasta": "15/03/2026", "GP": "China", "circuito": "Internacional de Shanghái"},
-  {"desde": "27/03/2026", "hasta": "29/03/2026", "GP": "Japón", "circuito": "Suzuka"},
-  {"desde": "10/04/2026", "hasta": "12/04/2026", "GP": "Baréin", "circuito": "Internacional de Baréin (Sakhir)"},
-  {"desde": "17/04/2026", "hasta": "19/04/2026", "GP": "Arabia Saudí", "circuito": "Jeddah Corniche"},
-  {"desde": "01/05/2026", "hasta": "03/05/2026", "GP": "Miami", "circuito": "Autódromo Internacional de Miami"},
-  {"desde": "22/05/2026", "hasta": "24/05/2026", "GP": "Canadá", "circuito": "Gilles Villeneuve"},
-  {"desde": "05/06/2026", "hasta": "07/06/2026", "GP": "Mónaco", "circuito": "Mónaco"},
-  {"desde": "12/06/2026", "hasta": "14/06/2026", "GP": "España - Barcelona", "circuito": "Barcelona-Catalunya"},
-  {"desde": "26/06/2026", "hasta": "28/06/2026", "GP": "Austria", "circuito": "Red Bull Ring"},
-  {"desde": "03/07/2026", "hasta": "05/07/2026", "GP": "Gran Bretaña", "circuito": "Silverstone"},
-  {"desde": "17/07/2026", "hasta": "19/07/2026", "GP": "Bélgica", "circuito": "Spa-Francorchamps"},
-  {"desde": "24/07/2026", "hasta": "26/07/2026", "GP": "Hungría", "circuito": "Hungaroring"},
-  {"desde": "21/08/2026", "hasta": "23/08/2026", "GP": "Países Bajos", "circuito": "Zandvoort"},
-  {"desde": "04/09/2026", "hasta": "06/09/2026", "GP": "Italia", "circuito": "Autodromo Nazionale Monza"},
-  {"desde": "11/09/2026", "hasta": "13/09/2026", "GP": "España - Madrid", "circuito": "Circuito urbano de Madrid (Madring)"},
-  {"desde": "25/09/2026", "hasta": "27/09/2026", "GP": "Azerbaiyán", "circuito": "Circuito urbano de Bakú"},
-  {"desde": "09/10/2026", "hasta": "11/10/2026", "GP": "Singapur", "circuito": "Circuito urbano de Marina Bay"},
-  {"desde": "23/10/2026", "hasta": "25/10/2026", "GP": "Estados Unidos", "circuito": "Circuito de las Américas (Austin)"},
-  {"desde": "30/10/2026", "hasta": "01/11/2026", "GP": "México", "circuito": "Autódromo Hermanos Rodríguez"},
-  {"desde": "06/11/2026", "hasta": "08/11/2026", "GP": "Brasil", "circuito": "Autódromo José Carlos Pace (Interlagos)"},
-  {"desde": "19/11/2026", "hasta": "21/11/2026", "GP": "Las Vegas", "circuito": "Circuito urbano de Las Vegas"},
-  {"desde": "27/11/2026", "hasta": "29/11/2026", "GP": "Catar", "circuito": "Internacional de Lusail"},
-  {"desde": "04/12/2026", "hasta": "06/12/2026", "GP": "Abu Dabi", "circuito": "Yas Marina"}
-]
+TABLE_NAME = "calendar"
+FTS_TABLE_NAME = "calendar_fts"
+META_TABLE_NAME = "calendar_meta"
+LEGACY_TABLE_NAME = "calendario_2026"     # Single-season table of schema versions 0 and 1
+DEFAULT_SEASON = 2026
+
+# Season files (JSON or CSV with columns desde, hasta, GP, circuito) and GP name aliases
+CALENDAR_DATA_DIR = "calendar_data"
+GP_ALIASES_FILE = os.path.join(CALENDAR_DATA_DIR, "gp_aliases.json")
 
 
 def _format_results(cursor):
@@ -44,90 +30,395 @@ def _format_results(cursor):
 def _get_month_number(month_name: str) -> str | None:
     """Translate the name of the month to its 2-digit number."""
     month_map = {
-        "january": "01", "february": "02", "march": "03", "april": "04", 
-        "may": "05", "june": "06", "july": "07", "august": "08", 
+        "january": "01", "february": "02", "march": "03", "april": "04",
+        "may": "05", "june": "06", "july": "07", "august": "08",
         "september": "09", "october": "10", "november": "11", "december": "12"
     }
     return month_map.get(month_name.lower(), None)
 
 
-def initialize_db():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+def _to_iso(date_text: str) -> str:
+    """'06/03/2026' (or already ISO '2026-03-06') -> '2026-03-06' (ISO text sorts and compares like a date)."""
+    if re.fullmatch(r"\d{4}-\d{2}-\d{2}", date_text):
+        return date_text
+    return datetime.strptime(date_text, "%d/%m/%Y").strftime("%Y-%m-%d")
+
+
+def _to_ddmmyyyy(date_text: str) -> str:
+    """Display format returned by the API ('06/03/2026')."""
+    return datetime.strptime(_to_iso(date_text), "%Y-%m-%d").strftime("%d/%m/%Y")
+
+
+# --- Connections ---
+# One read connection per thread, opened once and reused (sqlite3 connections
+# cannot be shared between threads; FastAPI runs sync endpoints in a thread pool).
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def _get_connection() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        initialize_db()
+        conn = sqlite3.connect(f"file:{DB_NAME}?mode=ro", uri=True)
+        _local.conn = conn
+    return conn
+
+
+def _query(sql: str, params: tuple = ()) -> list[dict]:
+    cursor = _get_connection().execute(sql, params)
+    return _format_results(cursor)
 
-    # 1. Crete table
+
+# --- Schema ---
+def _create_schema(cursor):
+    """Multi-season table, date indexes and FTS5 index (accent-insensitive) over names and aliases."""
     cursor.execute(f"""
         CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
             id INTEGER PRIMARY KEY,
+            season INTEGER NOT NULL,
+            round INTEGER NOT NULL,
             gp TEXT NOT NULL,
             circuito TEXT NOT NULL,
             desde TEXT NOT NULL,
-            hasta TEXT NOT NULL
+            hasta TEXT NOT NULL,
+            desde_iso TEXT NOT NULL,
+            hasta_iso TEXT NOT NULL,
+            UNIQUE (season, round)
+        )
+    """)
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{TABLE_NAME}_desde_iso ON {TABLE_NAME} (desde_iso)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{TABLE_NAME}_hasta_iso ON {TABLE_NAME} (hasta_iso)")
+    # Data version: incremented on every load, used by the API to invalidate its cache
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {META_TABLE_NAME} (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    cursor.execute(f"INSERT OR IGNORE INTO {META_TABLE_NAME} (key, value) VALUES ('data_version', 0)")
+    # rowid of the FTS table = id of the calendar table
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE_NAME} USING fts5(
+            gp, circuito, aliases,
+            tokenize = 'unicode61 remove_diacritics 2'
         )
     """)
-    conn.commit()
 
-    # 2. Insert data if empty
-    cursor.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}")
-    if cursor.fetchone()[0] == 0:
-        # print("Tabla del calendario vacía. Insertando 24 GPs.") # Usar print o logger fuera de Streamlit
-        for item in CALENDAR_DATA:
-            cursor.execute(f"""
-                INSERT INTO {TABLE_NAME} (gp, circuito, desde, hasta)
-                VALUES (?, ?, ?, ?)
-            """, (item['GP'], item['circuito'], item['desde'], item['hasta']))
-        conn.commit()
-    # else:
-        # print("Tabla del calendario ya tiene datos.")
 
-    conn.close()
+def _load_aliases() -> dict:
+    try:
+        with open(GP_ALIASES_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
 
 
-# --- Consulta por nombre de GP (se mantiene igual) ---
-def get_calendar_by_text(search_text: str, column_name: str):
+def _read_season_file(path: str) -> list[dict]:
+    """Rows of a JSON (list of objects) or CSV season file."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            return list(csv.DictReader(f))
+        return json.load(f)
+
+
+def bulk_load_season(conn: sqlite3.Connection, rows: list[dict]) -> int:
+    """
+    Replace the seasons present in rows with their content, using executemany
+    in a single transaction. The season is the year of each race start date.
+    Returns the number of races loaded.
     """
-    Check the calendar for partial text in the GP or circuit name.
+    aliases = _load_aliases()
+    rows = sorted(rows, key=lambda item: _to_iso(item['desde']))
+    records = []
+    rounds = {}
+    for item in rows:
+        desde_iso, hasta_iso = _to_iso(item['desde']), _to_iso(item['hasta'])
+        season = int(item.get('season') or desde_iso[:4])
+        rounds[season] = rounds.get(season, 0) + 1
+        records.append((
+            season, rounds[season], item['GP'], item['circuito'],
+            _to_ddmmyyyy(item['desde']), _to_ddmmyyyy(item['hasta']), desde_iso, hasta_iso
+        ))
 
-    :param search_text: The partial text to search for (e.g., 'Barcelona' or 'Spain').
-    :param column_name: 'gp' or 'circuito'.
+    with conn:
+        for season in rounds:
+            conn.execute(f"DELETE FROM {FTS_TABLE_NAME} WHERE rowid IN (SELECT id FROM {TABLE_NAME} WHERE season = ?)", (season,))
+            conn.execute(f"DELETE FROM {TABLE_NAME} WHERE season = ?", (season,))
+        conn.executemany(f"""
+            INSERT INTO {TABLE_NAME} (season, round, gp, circuito, desde, hasta, desde_iso, hasta_iso)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, records)
+        seasons = tuple(rounds)
+        placeholders = ",".join("?" * len(seasons))
+        inserted = conn.execute(
+            f"SELECT id, gp, circuito FROM {TABLE_NAME} WHERE season IN ({placeholders})", seasons
+        ).fetchall()
+        conn.executemany(
+            f"INSERT INTO {FTS_TABLE_NAME} (rowid, gp, circuito, aliases) VALUES (?, ?, ?, ?)",
+            [(row_id, gp, circuito, " ".join(aliases.get(gp, []))) for row_id, gp, circuito in inserted]
+        )
+        conn.execute(f"UPDATE {META_TABLE_NAME} SET value = value + 1 WHERE key = 'data_version'")
+    return len(records)
+
+
+def load_calendar_file(path: str) -> int:
+    """Bulk load (or reload) the seasons contained in a JSON/CSV file."""
+    conn = sqlite3.connect(DB_NAME)
+    try:
+        return bulk_load_season(conn, _read_season_file(path))
+    finally:
+        conn.close()
+
+
+# --- Schema migrations (PRAGMA user_version) ---
+def _migrate_to_v1(cursor):
+    """ISO date columns (YYYY-MM-DD) with indexes, filled from the DD/MM/YYYY text columns."""
+    columns = {row[1] for row in cursor.execute(f"PRAGMA table_info({LEGACY_TABLE_NAME})")}
+    if "desde_iso" not in columns:
+        cursor.execute(f"ALTER TABLE {LEGACY_TABLE_NAME} ADD COLUMN desde_iso TEXT")
+        cursor.execute(f"ALTER TABLE {LEGACY_TABLE_NAME} ADD COLUMN hasta_iso TEXT")
+    rows = cursor.execute(f"SELECT id, desde, hasta FROM {LEGACY_TABLE_NAME}").fetchall()
+    cursor.executemany(
+        f"UPDATE {LEGACY_TABLE_NAME} SET desde_iso = ?, hasta_iso = ? WHERE id = ?",
+        [(_to_iso(desde), _to_iso(hasta), row_id) for row_id, desde, hasta in rows]
+    )
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{LEGACY_TABLE_NAME}_desde_iso ON {LEGACY_TABLE_NAME} (desde_iso)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{LEGACY_TABLE_NAME}_hasta_iso ON {LEGACY_TABLE_NAME} (hasta_iso)")
+
+
+def _migrate_to_v2(cursor):
+    """Multi-season schema: move the single-season table into 'calendar' (season 2026) and drop it."""
+    _create_schema(cursor)
+    rows = cursor.execute(f"SELECT gp, circuito, desde, hasta FROM {LEGACY_TABLE_NAME}").fetchall()
+    bulk_load_season(cursor.connection, [
+        {"GP": gp, "circuito": circuito, "desde": desde, "hasta": hasta, "season": DEFAULT_SEASON}
+        for gp, circuito, desde, hasta in rows
+    ])
+    cursor.execute(f"DROP TABLE {LEGACY_TABLE_NAME}")
+
+
+MIGRATIONS = [_migrate_to_v1, _migrate_to_v2]
+
+
+def initialize_db():
     """
-    if column_name not in ['gp', 'circuito']:
-        return []
+    Create/migrate the database and load the pending season files.
+    Idempotent: only the first call of the process touches the file (call it explicitly
+    at service startup; reads also trigger it lazily).
+    """
+    global _initialized
+    if _initialized:
+        return
+    with _init_lock:
+        if not _initialized:
+            _initialize_db()
+            _initialized = True
+
 
+def _initialize_db():
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
 
-    # Usamos la columna especificada y LIKE para búsqueda parcial.
-    query = f"SELECT gp, circuito, desde, hasta FROM {TABLE_NAME} WHERE {column_name} LIKE ?"
-    cursor.execute(query, ('%' + search_text + '%',))
+    # 1. Apply pending schema migrations (databases created with the single-season table)
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    legacy = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (LEGACY_TABLE_NAME,)
+    ).fetchone()
+    if legacy:
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+
+    # 2. Crete tables (new databases start directly at the latest version)
+    _create_schema(cursor)
+    cursor.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+    conn.commit()
+
+    # 3. Bulk load the season files that are not in the database yet
+    loaded = {row[0] for row in cursor.execute(f"SELECT DISTINCT season FROM {TABLE_NAME}")}
+    if os.path.isdir(CALENDAR_DATA_DIR):
+        for name in sorted(os.listdir(CALENDAR_DATA_DIR)):
+            match = re.fullmatch(r"f1_(\d{4})\.(json|csv)", name)
+            if match and int(match.group(1)) not in loaded:
+                bulk_load_season(conn, _read_season_file(os.path.join(CALENDAR_DATA_DIR, name)))
 
-    results = _format_results(cursor)
     conn.close()
-    return results
 
 
-def get_calendar_by_month(month_name: str):
+def _fts_query(search_text: str, columns: str) -> str | None:
     """
-    Search for GPs whose 'from' or 'to' field falls within the specified month.
+    FTS5 query: every word of the text as a prefix term, restricted to the given columns.
+    Diacritics are folded by the tokenizer ('Japon' finds 'Japón').
     """
+    words = re.findall(r"\w+", search_text)
+    if not words:
+        return None
+    # Parenthesized: a column filter only applies to the phrase right after it
+    return f"{{{columns}}} : (" + " ".join(f'"{word}"*' for word in words) + ")"
+
+
+def get_data_version() -> int:
+    """Counter incremented every time calendar data is loaded (cache invalidation)."""
+    row = _get_connection().execute(
+        f"SELECT value FROM {META_TABLE_NAME} WHERE key = 'data_version'"
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def _month_range(month_name: str, season: int) -> tuple[str, str] | None:
+    """ISO [start, end) of a month of the season."""
     month_num = _get_month_number(month_name)
     if not month_num:
+        return None
+    month_start = date(season, int(month_num), 1)
+    month_end = date(season + 1, 1, 1) if month_num == "12" else date(season, int(month_num) + 1, 1)
+    return month_start.isoformat(), month_end.isoformat()
+
+
+# --- Consulta por nombre de GP o circuito (FTS5) ---
+def get_calendar_by_text(search_text: str, column_name: str, season: int | None = DEFAULT_SEASON):
+    """
+    Check the calendar for text in the GP or circuit name, including English/Spanish aliases
+    ('Bahrain' finds 'Baréin'). An empty text returns the whole season.
+
+    :param search_text: The partial text to search for (e.g., 'Barcelona' or 'Spain').
+    :param column_name: 'gp' or 'circuito'.
+    :param season: Season year, or None for all the seasons.
+    """
+    if column_name not in ['gp', 'circuito']:
         return []
 
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    season_filter = "c.season = ?" if season else "1 = 1"
+    season_params = (season,) if season else ()
+    match = _fts_query(search_text, f"{column_name} aliases")
+    if match is None:
+        query = f"""
+            SELECT c.season, c.gp, c.circuito, c.desde, c.hasta FROM {TABLE_NAME} c
+            WHERE {season_filter} ORDER BY c.desde_iso
+        """
+        return _query(query, season_params)
 
-    month_pattern = f'%/{month_num}/%'
     query = f"""
-        SELECT gp, circuito, desde, hasta 
-        FROM {TABLE_NAME} 
-        WHERE desde LIKE ? OR hasta LIKE ?
+        SELECT c.season, c.gp, c.circuito, c.desde, c.hasta
+        FROM {FTS_TABLE_NAME} f JOIN {TABLE_NAME} c ON c.id = f.rowid
+        WHERE {FTS_TABLE_NAME} MATCH ? AND {season_filter}
+        ORDER BY c.desde_iso
     """
-    cursor.execute(query, (month_pattern, month_pattern))
+    return _query(query, (match, *season_params))
 
-    results = _format_results(cursor)
-    conn.close()
+
+def get_calendar_by_month(month_name: str, season: int = DEFAULT_SEASON):
+    """
+    Search for GPs whose 'from' or 'to' field falls within the specified month of the season.
+    Two index range seeks (desde_iso, hasta_iso) instead of a LIKE full scan.
+    """
+    month_range = _month_range(month_name, season)
+    if not month_range:
+        return []
+
+    query = f"""
+        SELECT season, gp, circuito, desde, hasta
+        FROM {TABLE_NAME}
+        WHERE (desde_iso >= ? AND desde_iso < ?) OR (hasta_iso >= ? AND hasta_iso < ?)
+        ORDER BY desde_iso
+    """
+    start, end = month_range
+    return _query(query, (start, end, start, end))
+
+
+def get_calendar_between(date_from: date, date_to: date):
+    """Search for GPs held (at least partly) between two dates, both included."""
+    query = f"""
+        SELECT season, gp, circuito, desde, hasta
+        FROM {TABLE_NAME}
+        WHERE desde_iso <= ? AND hasta_iso >= ?
+        ORDER BY desde_iso
+    """
+    return _query(query, (date_to.isoformat(), date_from.isoformat()))
+
+
+def get_next_race(after_date: date):
+    """First GP starting after the given date (a single index seek)."""
+    query = f"""
+        SELECT season, gp, circuito, desde, hasta
+        FROM {TABLE_NAME}
+        WHERE desde_iso > ?
+        ORDER BY desde_iso
+        LIMIT 1
+    """
+    return _query(query, (after_date.isoformat(),))
+
+
+def _sub_query_sql(index: int, sub_query: dict) -> tuple[str, list]:
+    """
+    SELECT of one sub-query of a batch. The gp/circuit/month/date range filters present are
+    combined with AND or OR ('combine'); the season, if given, always restricts the results.
+    """
+    conditions, params = [], []
+    season = sub_query.get("season")
+
+    for field, columns in (("gp_name", "gp aliases"), ("circuit_name", "circuito aliases")):
+        if sub_query.get(field):
+            match = _fts_query(sub_query[field], columns)
+            if match:
+                conditions.append(f"c.id IN (SELECT rowid FROM {FTS_TABLE_NAME} WHERE {FTS_TABLE_NAME} MATCH ?)")
+                params.append(match)
+            else:
+                conditions.append("0 = 1")
+
+    if sub_query.get("month_name"):
+        month_num = _get_month_number(sub_query["month_name"])
+        if not month_num:
+            conditions.append("0 = 1")
+        elif season:
+            conditions.append("((c.desde_iso >= ? AND c.desde_iso < ?) OR (c.hasta_iso >= ? AND c.hasta_iso < ?))")
+            params.extend(_month_range(sub_query["month_name"], season) * 2)
+        else:
+            # All seasons: that month of every year (no index range available)
+            conditions.append("(strftime('%m', c.desde_iso) = ? OR strftime('%m', c.hasta_iso) = ?)")
+            params.extend([month_num, month_num])
+
+    if sub_query.get("date_from") or sub_query.get("date_to"):
+        conditions.append("(c.desde_iso <= ? AND c.hasta_iso >= ?)")
+        params.extend([(sub_query.get("date_to") or date.max).isoformat(),
+                       (sub_query.get("date_from") or date.min).isoformat()])
+
+    operator = " OR " if sub_query.get("combine", "and").lower() == "or" else " AND "
+    where = f"({operator.join(conditions) or '1 = 1'})"
+    if season:
+        where += " AND c.season = ?"
+        params.append(season)
+
+    sql = f"""
+        SELECT {index} AS query_index, c.season, c.gp, c.circuito, c.desde, c.hasta, c.desde_iso
+        FROM {TABLE_NAME} c WHERE {where}
+    """
+    return sql, params
+
+
+def get_calendar_batch(sub_queries: list[dict]) -> list[list[dict]]:
+    """
+    Answer several sub-queries (gp_name, circuit_name, month_name, date_from, date_to,
+    season, combine) in a single SQL round-trip (UNION ALL).
+    Returns one result list per sub-query, in the same order.
+    """
+    if not sub_queries:
+        return []
+    selects, params = [], []
+    for index, sub_query in enumerate(sub_queries):
+        sql, sub_params = _sub_query_sql(index, sub_query)
+        selects.append(sql)
+        params.extend(sub_params)
+
+    rows = _query(" UNION ALL ".join(selects) + " ORDER BY query_index, desde_iso", tuple(params))
+    results = [[] for _ in sub_queries]
+    for row in rows:
+        index = row.pop("query_index")
+        row.pop("desde_iso")
+        results[index].append(row)
     return results
 
 
-initialize_db()
+if __name__ == "__main__":
+    # python db_calendar.py calendar_data/f1_2027.csv [...]: bulk load season files
+    initialize_db()
+    for path in sys.argv[1:]:
+        print(f"{path}: {load_calendar_file(path)} races loaded.")
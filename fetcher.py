@@ -0,0 +1,160 @@
+# fetcher.py
+
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from news_source_config import DEFAULT_HOST_POLICY, HOST_POLICIES, USER_AGENTS
+
+REQUEST_TIMEOUT = 20
+MAX_RETRIES = 3                     # Retries on 429/503 (after the adaptive wait)
+ROBOTS_TTL_SECONDS = 24 * 3600
+RETRY_STATUS = (429, 503)
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+
+class RobotsDisallowed(Exception):
+    """The URL is disallowed by the host's robots.txt."""
+
+
+def response_html(response: requests.Response) -> str:
+    """
+    Decoded HTML of a response. Without a charset in the Content-Type requests assumes
+    ISO-8859-1 for text/html: like newspaper's downloader, the <meta charset> of the page
+    (or the detected encoding) is used instead.
+    """
+    if "charset" not in response.headers.get("Content-Type", "").lower():
+        declared = META_CHARSET_RE.search(response.content[:4096])
+        response.encoding = declared.group(1).decode("ascii") if declared else response.apparent_encoding
+    return response.text
+
+
+class _HostSlot:
+    """Per-host state: keep-alive session, concurrency limit, pacing and robots.txt cache."""
+
+    def __init__(self, host: str, policy: dict):
+        self.host = host
+        self.min_delay = policy["min_delay"]
+        self.max_delay = policy["max_delay"]
+        self.delay = self.min_delay
+        self.semaphore = threading.BoundedSemaphore(policy["max_concurrency"])
+        self.lock = threading.Lock()
+        self.next_request_at = 0.0
+
+        # One stable User-Agent per host: rotating it per request defeats connection reuse
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = random.choice(USER_AGENTS)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=policy["max_concurrency"])
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.robots = None
+        self.robots_fetched_at = 0.0
+
+    def wait_turn(self):
+        """Reserve the next request time for this host and sleep until it arrives."""
+        with self.lock:
+            now = time.monotonic()
+            start_at = max(now, self.next_request_at)
+            self.next_request_at = start_at + self.delay
+        time.sleep(max(0.0, start_at - time.monotonic()))
+
+    def slow_down(self, retry_after: str | None):
+        """Adaptive backoff on 429/503: honour Retry-After or double the delay."""
+        with self.lock:
+            if retry_after and retry_after.isdigit():
+                self.delay = min(self.max_delay, max(self.delay, float(retry_after)))
+            else:
+                self.delay = min(self.max_delay, self.delay * 2)
+            self.next_request_at = max(self.next_request_at, time.monotonic() + self.delay)
+
+    def speed_up(self):
+        """Successful response: decay the delay back towards the configured minimum."""
+        with self.lock:
+            self.delay = max(self.min_delay, self.delay * 0.75)
+
+
+class FetchScheduler:
+    """
+    Polite HTTP fetcher for many sources.
+    Per host: pooled keep-alive session, max concurrent requests, minimum delay between
+    requests, cached robots.txt and adaptive slowdown on 429/503.
+    Different hosts are fetched in parallel.
+    """
+
+    def __init__(self, host_policies: dict = HOST_POLICIES, max_workers: int = 8):
+        self._host_policies = host_policies
+        self._slots = {}
+        self._slots_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+
+    def _slot(self, host: str) -> _HostSlot:
+        with self._slots_lock:
+            if host not in self._slots:
+                policy = {**DEFAULT_HOST_POLICY, **self._host_policies.get(host, {})}
+                self._slots[host] = _HostSlot(host, policy)
+            return self._slots[host]
+
+    def _allowed(self, slot: _HostSlot, url: str) -> bool:
+        """Check robots.txt (downloaded once per host and cached for ROBOTS_TTL_SECONDS)."""
+        with slot.lock:
+            expired = time.monotonic() - slot.robots_fetched_at > ROBOTS_TTL_SECONDS
+        if slot.robots is None or expired:
+            parsed = urlparse(url)
+            robots = RobotFileParser()
+            try:
+                response = slot.session.get(f"{parsed.scheme}://{parsed.netloc}/robots.txt", timeout=REQUEST_TIMEOUT)
+                if response.status_code >= 400:
+                    robots.allow_all = True          # No robots.txt: everything allowed
+                else:
+                    robots.parse(response.text.splitlines())
+            except requests.exceptions.RequestException:
+                robots.allow_all = True
+            with slot.lock:
+                slot.robots = robots
+                slot.robots_fetched_at = time.monotonic()
+        return slot.robots.can_fetch(slot.session.headers['User-Agent'], url)
+
+    def fetch(self, url: str, headers: dict | None = None) -> requests.Response:
+        """
+        Fetch a URL respecting the host limits. Raises RobotsDisallowed or
+        requests exceptions; returns the last response after exhausting retries.
+        """
+        slot = self._slot(urlparse(url).netloc)
+        if not self._allowed(slot, url):
+            raise RobotsDisallowed(f"robots.txt disallows {url}")
+
+        for attempt in range(MAX_RETRIES + 1):
+            with slot.semaphore:
+                slot.wait_turn()
+                response = slot.session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+            if response.status_code not in RETRY_STATUS:
+                slot.speed_up()
+                return response
+            slot.slow_down(response.headers.get('Retry-After'))
+        return response
+
+    def fetch_many(self, urls: list[str]) -> list[tuple[str, requests.Response | Exception]]:
+        """
+        Fetch several URLs in parallel (the per-host limits still apply).
+        Returns [(url, response or exception)] in the same order as urls.
+        """
+        def _safe_fetch(url):
+            try:
+                return url, self.fetch(url)
+            except Exception as e:
+                return url, e
+        return list(self._executor.map(_safe_fetch, urls))
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        with self._slots_lock:
+            for slot in self._slots.values():
+                slot.session.close()
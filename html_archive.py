@@ -0,0 +1,120 @@
+# html_archive.py
+
+import gzip
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from crawl_state import content_hash
+
+# zstd is optional: faster and smaller than gzip if the 'zstandard' package is installed
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARCHIVE_DIR = "f1_html_archive"
+INDEX_NAME = "index.db"
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024    # Roll over to a new segment file after 64 MB
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class HtmlArchive:
+    """
+    Content-addressed archive of the raw HTML of every downloaded article.
+    Each page is compressed on its own and appended to a segment file; a SQLite index maps
+    its SHA-256 to (segment, offset, length), so any page can be read with a single seek.
+    Identical pages are stored only once.
+    """
+
+    def __init__(self, archive_dir: str = ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+        os.makedirs(archive_dir, exist_ok=True)
+        self.codec = "zstd" if zstandard else "gzip"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(archive_dir, INDEX_NAME), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                hash TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                source_url TEXT NOT NULL,
+                fetched_at TEXT NOT NULL,
+                segment TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                codec TEXT NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def _current_segment(self) -> str:
+        """Last segment file, or a new one if it is full."""
+        segments = sorted(name for name in os.listdir(self.archive_dir) if name.startswith("segment-"))
+        suffix = ".zst" if self.codec == "zstd" else ".gz"
+        if segments and segments[-1].endswith(suffix):
+            last = segments[-1]
+            if os.path.getsize(os.path.join(self.archive_dir, last)) < SEGMENT_MAX_BYTES:
+                return last
+        return f"segment-{len(segments) + 1:05d}{suffix}"
+
+    def put(self, url: str, html: str, source_url: str) -> str:
+        """Store the page (if it is not already archived) and return its content hash."""
+        html_hash = content_hash(html)
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM pages WHERE hash = ?", (html_hash,)).fetchone()
+            if exists:
+                return html_hash
+            data = _compress(html.encode("utf-8"), self.codec)
+            segment = self._current_segment()
+            with open(os.path.join(self.archive_dir, segment), "ab") as f:
+                offset = f.tell()
+                f.write(data)
+            self._conn.execute(
+                "INSERT INTO pages (hash, url, source_url, fetched_at, segment, offset, length, codec) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (html_hash, url, source_url, datetime.utcnow().isoformat(timespec="seconds"),
+                 segment, offset, len(data), self.codec)
+            )
+            self._conn.commit()
+        return html_hash
+
+    def get(self, html_hash: str) -> str | None:
+        """Read and decompress an archived page."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT segment, offset, length, codec FROM pages WHERE hash = ?", (html_hash,)
+            ).fetchone()
+        if row is None:
+            return None
+        segment, offset, length, codec = row
+        with open(os.path.join(self.archive_dir, segment), "rb") as f:
+            f.seek(offset)
+            return _decompress(f.read(length), codec).decode("utf-8")
+
+    def records(self, source_url: str | None = None) -> list[dict]:
+        """Metadata of the archived pages (optionally of a single source), oldest first."""
+        query = "SELECT hash, url, source_url, fetched_at FROM pages"
+        params = ()
+        if source_url:
+            query += " WHERE source_url = ?"
+            params = (source_url,)
+        with self._lock:
+            cursor = self._conn.execute(query + " ORDER BY fetched_at", params)
+            columns = [col[0] for col in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,16 +1,36 @@
 # llm_client.py
 
+from __future__ import annotations
+
 import os
+import threading
+from typing import TYPE_CHECKING
 import requests
-from google import genai
-from langchain_community.embeddings import SentenceTransformerEmbeddings
 import streamlit as st
 
+# Heavy dependencies (google.genai, LangChain, sentence-transformers) are imported
+# inside the functions that use them, so importing this module is cheap.
+if TYPE_CHECKING:
+    from google import genai
+
 # --- Configuración de Modelos ---
 EMBEDDING_MODEL_LOCAL = "all-MiniLM-L6-v2"
+
+# Embedding backend (same model and vector space, different runtime):
+#   torch     -> full-precision PyTorch (reference)
+#   onnx      -> ONNX Runtime export of the model (needs 'pip install sentence-transformers[onnx]')
+#   onnx-int8 -> ONNX Runtime with dynamically quantized int8 weights (fastest on CPU)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_ONNX_INT8_FILE = os.getenv("EMBEDDING_ONNX_INT8_FILE", "onnx/model_qint8_avx2.onnx")
+EMBEDDING_BACKENDS = {
+    "torch": {},
+    "onnx": {"backend": "onnx"},
+    "onnx-int8": {"backend": "onnx", "model_kwargs": {"file_name": EMBEDDING_ONNX_INT8_FILE}},
+}
 LLM_MODEL = "gemini-2.0-flash"
 
 CALENDAR_API_URL = os.getenv("CALENDAR_API_URL", "http://127.0.0.1:8000")
+BATCH_FUNCTION_NAME = "query_f1_calendar_batch"
 
 
 def get_gemini_client():
@@ -21,23 +41,85 @@ def get_gemini_client():
     try:
         if not os.getenv("GEMINI_API_KEY"):
             raise ValueError("GEMINI_API_KEY it is not configured.")
+        from google import genai
         return genai.Client()
     except Exception as e:
         # Re-lanzamos la excepción para que Streamlit la muestre
         raise Exception(f"Error initializing Gemini client: {e}")
 
 
+_embedding_function = None
+_embedding_lock = threading.Lock()
+
+
+def make_embedding_function(backend: str = EMBEDDING_BACKEND):
+    """
+    New Sentence Transformers embeddings function (local) running on the given backend.
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Options: {', '.join(EMBEDDING_BACKENDS)}")
+    from langchain_community.embeddings import SentenceTransformerEmbeddings
+    return SentenceTransformerEmbeddings(model_name=EMBEDDING_MODEL_LOCAL, model_kwargs=EMBEDDING_BACKENDS[backend])
+
+
 def get_local_embedding_function():
     """
-    Initializes and returns the Sentence Transformers embeddings function (local).
+    Initializes and returns the Sentence Transformers embeddings function (local, EMBEDDING_BACKEND).
+    The model is loaded once per process and shared (thread-safe lazy initialization).
     """
-    return SentenceTransformerEmbeddings(model_name=EMBEDDING_MODEL_LOCAL)
+    global _embedding_function
+    if _embedding_function is None:
+        with _embedding_lock:
+            if _embedding_function is None:
+                _embedding_function = make_embedding_function(EMBEDDING_BACKEND)
+    return _embedding_function
+
+
+def _schema_type(prop: dict) -> str:
+    """JSON schema type of an OpenAPI property (optional fields use anyOf [type, null])."""
+    if 'type' in prop:
+        return prop['type']
+    types = [option.get('type') for option in prop.get('anyOf', []) if option.get('type') != 'null']
+    return types[0] if types else 'string'
+
+
+def _batch_function_declaration(openapi_spec: dict) -> genai.types.FunctionDeclaration:
+    """
+    Single declaration for compound calendar questions: a list of sub-queries
+    answered by the API in one call (one LLM turn instead of one per filter).
+    """
+    from google import genai
+
+    sub_query = openapi_spec['components']['schemas']['CalendarSubQuery']
+    sub_query_properties = {}
+    for name, prop in sub_query['properties'].items():
+        sub_query_properties[name] = {'type': _schema_type(prop), 'description': prop.get('description', '')}
+        if 'enum' in prop:
+            sub_query_properties[name]['enum'] = prop['enum']
+
+    return genai.types.FunctionDeclaration(
+        name=BATCH_FUNCTION_NAME,
+        description=openapi_spec['paths']['/calendar/batch']['post']['summary'],
+        parameters={
+            'type': 'object',
+            'properties': {
+                'queries': {
+                    'type': 'array',
+                    'description': 'One sub-query per GP, circuit, month or date range asked by the user.',
+                    'items': {'type': 'object', 'properties': sub_query_properties}
+                }
+            },
+            'required': ['queries']
+        }
+    )
 
 
 def _prepare_tools() -> list[genai.types.Tool]:
     """
     Download the OpenAPI schema from the API Tool and use it to configure the Tool.
     """
+    from google import genai
+
     tools = []
     api_uri = f"{CALENDAR_API_URL}/openapi.json"
 
@@ -66,10 +148,12 @@ def _prepare_tools() -> list[genai.types.Tool]:
             parameters=parameters_dict
         )
 
-        calendar_tool = genai.types.Tool(function_declarations=[function_declaration])
+        batch_declaration = _batch_function_declaration(openapi_spec)
+
+        calendar_tool = genai.types.Tool(function_declarations=[function_declaration, batch_declaration])
         tools.append(calendar_tool)
 
-        st.success(f"✅ Configured Tool: **{function_declaration.name}** (Calendar)")
+        st.success(f"✅ Configured Tools: **{function_declaration.name}**, **{batch_declaration.name}** (Calendar)")
 
     except requests.exceptions.RequestException as e:
         st.error(f"❌ Network/HTTP error loading the Tool from {api_uri}. The API must be running. Error:**{e}**")
@@ -85,22 +169,30 @@ def _handle_function_call(client: genai.Client,
     """
     Execute the function call (API Tool) and pass the result to the LLM.   
     """
+    from google import genai
+
     function_call = response_1.function_calls[0]
     function_name = function_call.name
     st.warning(f"🤖 The LLM has decided to ignore the RAG and call the Tool**: {function_name}")
 
     # 1. Construir URL de la API
-    url_endpoint = "/calendar/query"
     params = function_call.args
-    query_string = "&".join(f"{key}={value}" for key, value in params.items())
-    full_url = f"{CALENDAR_API_URL}{url_endpoint}?{query_string}"
-
-    st.code(f"🔨 Generated API URL:\n{full_url}", language="http")
+    if function_name == BATCH_FUNCTION_NAME:
+        full_url = f"{CALENDAR_API_URL}/calendar/batch"
+        st.code(f"🔨 Generated API request:\nPOST {full_url}\n{params}", language="http")
+    else:
+        url_endpoint = "/calendar/query"
+        query_string = "&".join(f"{key}={value}" for key, value in params.items())
+        full_url = f"{CALENDAR_API_URL}{url_endpoint}?{query_string}"
+        st.code(f"🔨 Generated API URL:\n{full_url}", language="http")
 
     # 2. Ejecutar la llamada HTTP
     tool_output = None
     try:
-        api_response = requests.get(full_url)
+        if function_name == BATCH_FUNCTION_NAME:
+            api_response = requests.post(full_url, json=dict(params))
+        else:
+            api_response = requests.get(full_url)
         api_response.raise_for_status()
         tool_output = api_response.json()
         # if tool output result is a list convert to dict
@@ -139,10 +231,11 @@ def _handle_function_call(client: genai.Client,
     return second_response.text
 
 
-def unified_query_gemini(prompt: str, vector_store) -> str:
+def unified_query_gemini(prompt: str, vector_store=None) -> str:
     """
     Central query: configures RAG and Tools. The LLM decides which resource to use.
     """
+    from google import genai
     from rag import get_rag_context
 
     client = get_gemini_client()
@@ -27,9 +27,30 @@ F1_SOURCES = [{"url": url, **config} for url, config in F1_SOURCE_CONFIG.items()
 # Used to determine the relevance of the articles.
 # -------------------------------------------------------------------
 F1_KEYWORDS = ['f1', 'fórmula 1', 'formula 1', 'verstappen', 'hamilton', 'alonso', 'sainz', 'wolff',
-               'leclerc', 'red bull', 'mercedes', 'ferrari', 'gp', 'gran premio', 'aston martin'
+               'leclerc', 'red bull', 'mercedes', 'ferrari', 'gp', 'gran premio', 'aston martin',
                'mclaren', 'alpine', 'pit stop', 'parrilla', 'carrera', 'colapinto']
 
+# Generic words that also appear in unrelated news: they only add half a point
+# to a candidate that also matches a specific keyword
+F1_GENERIC_KEYWORDS = {'gp', 'carrera', 'parrilla', 'pit stop', 'mercedes', 'alpine'}
+
+# Reference texts for the (optional) title embedding similarity score
+F1_REFERENCE_TEXTS = [
+    'Formula 1 Grand Prix race news, drivers and teams',
+    'Noticias de Fórmula 1: pilotos, escuderías y Gran Premio',
+]
+
+# -------------------------------------------------------------------
+# PER-HOST POLITENESS (HOST_POLICIES)
+# Max parallel requests and min delay (seconds) between requests to the same host.
+# The delay grows automatically on 429/503 responses, up to max_delay.
+# -------------------------------------------------------------------
+DEFAULT_HOST_POLICY = {"max_concurrency": 2, "min_delay": 1.0, "max_delay": 60.0}
+
+HOST_POLICIES = {
+    "www.f1technical.net": {"max_concurrency": 2, "min_delay": 1.5},
+}
+
 # -------------------------------------------------------------------
 # User agents for web scarper
 # -------------------------------------------------------------------
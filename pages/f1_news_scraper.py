@@ -2,8 +2,7 @@
 
 import streamlit as st
 from datetime import datetime, timedelta
-from scraper import fetch_recent_news
-from rag import get_vector_store, update_db_with_news
+from crawler_daemon import read_status, request_crawl
 
 st.set_page_config(
     page_title="📡 News Scraping and Summary"
@@ -13,6 +12,10 @@ st.title("📡 F1 News Scraping and Summary")
 st.caption("Obtaining real (simulated) data from websites, summarizing with Gemini, and indexing in FAISS.")
 st.markdown("---")
 
+# El scraping corre en el daemon (crawler_daemon.py): esta página solo lee su estado
+st.info("The crawl runs in the background crawler. Start it in a separate terminal with "
+        "**`python crawler_daemon.py`** (or `--once` for a single run).")
+
 st.header("1. Scrape setup")
 
 default_date = datetime.today() - timedelta(days=7) # Por defecto, la última semana
@@ -23,50 +26,42 @@ start_date = st.date_input(
 )
 start_datetime = datetime(start_date.year, start_date.month, start_date.day)
 
-if st.button("🚀 Start Web Scraping and Summary",
+if st.button("🚀 Request Web Scraping and Summary now",
              type="primary", use_container_width=True):
+    request_crawl(start_datetime)
+    st.success("Crawl requested. The background crawler will pick it up within a few seconds.")
 
-    # 1. Obtener la base de datos
-    vector_store = get_vector_store()
-
-    st.subheader("2. Process in progress...")
-
-    # 2. Ejecutar el scraping
-    with st.status("Starting the scraping and summarization process...", expanded=True) as status:
-        st.write(f"Searching for news from **{start_date.strftime('%Y-%m-%d')}**")
-
-        try:
-            # fetch_recent_news returns tuple (articles, status_messages)
-            new_data, messages = fetch_recent_news(start_datetime)
-            
-            for msg_type, content in messages:
-                if msg_type == 'info':
-                    st.info(content)
-                elif msg_type == 'success':
-                    st.success(content)
-                elif msg_type == 'warning':
-                    st.warning(content)
-                elif msg_type == 'error':
-                    st.error(content)
-                elif msg_type == 'code':
-                    st.code(content, language="html")  # To show debug HTML code
-
-            if new_data:
-                st.success(f"🎉 They were found and processed {len(new_data)} articles.")
+st.header("2. Crawler status")
+st.button("🔄 Refresh status")
 
-                # FAISS update and index
-                status.update(label="Indexing new abstracts in FAISS...", state="running", expanded=True)                
-                update_db_with_news(vector_store, new_data)
+status = read_status()
+if status is None:
+    st.warning("The background crawler has not run yet.")
+else:
+    state = status.get("state", "unknown")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("State", state)
+    col2.metric("Indexed in last crawl", status.get("indexed", 0))
+    col3.metric("FAISS documents", status.get("db_size", "-"))
+    st.caption(f"Started: {status.get('started_at')} | Finished: {status.get('finished_at')} | "
+               f"Next run: {status.get('next_run_at', '-')}")
 
-                st.subheader("3. Indexed Abstracts:")
-                for item in new_data:
-                    st.code(f"[{item['driver']} | {item['source']}]: {item['content']}", language="markdown")
+    if state == "error":
+        st.error(f"Last crawl failed: {status.get('last_error')}")
 
-                status.update(label="Complete Scraping and Indexing Process.", state="complete", expanded=False)
-            else:
-                st.warning("No new articles were found, or scraping was blocked. Try changing the date or fonts.")
-                status.update(label="Process completed without results.", state="complete", expanded=False)
+    with st.expander("Crawl log", expanded=state == "running"):
+        for msg_type, content in status.get("events", []):
+            if msg_type == 'info':
+                st.info(content)
+            elif msg_type == 'success':
+                st.success(content)
+            elif msg_type == 'warning':
+                st.warning(content)
+            elif msg_type == 'error':
+                st.error(content)
+            elif msg_type == 'code':
+                st.code(content, language="html")  # To show debug HTML code
 
-        except Exception as e:
-            st.error(f"Critical failure in the scraping/LLM process: {e}")
-            status.update(label="Process Failed.", state="error")
+    st.subheader("3. Indexed Abstracts:")
+    for item in status.get("indexed_items", []):
+        st.code(f"[{item['driver']} | {item['source']}]: {item['content']}", language="markdown")
@@ -0,0 +1,188 @@
+# pipeline.py
+
+import queue
+import threading
+from datetime import datetime
+
+from crawl_state import CrawlState, STATUS_INDEXED, STATUS_ERROR
+from rag import index_news, index_write_lock, load_vector_store
+from scraper import iter_recent_articles, to_rag_item, mock_news_item
+from summarizer import summarize_batch_with_gemini, BATCH_MAX_ARTICLES
+
+# --- Pipeline configuration ---
+STAGE_QUEUE_SIZE = 8          # Bounded queues: a slow stage blocks the previous one (backpressure)
+INDEX_MICRO_BATCH = 4         # Summaries embedded/indexed together
+BATCH_WAIT_SECONDS = 0.5      # Max wait to fill a batch before flushing what is available
+
+_END = object()               # End-of-stream marker between stages
+
+
+class _EventSink:
+    """
+    Drop-in replacement of the 'messages' list: every append is streamed
+    to the UI through the event queue instead of being accumulated.
+    """
+
+    def __init__(self, events: queue.Queue):
+        self._events = events
+
+    def append(self, event: tuple):
+        self._events.put(event)
+
+
+def _put(q: queue.Queue, item, stop: threading.Event):
+    """Blocking put that gives up if the pipeline is stopping (avoids deadlocks on failures)."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.2)
+            return
+        except queue.Full:
+            continue
+
+
+def _next_batch(q: queue.Queue, max_items: int, stop: threading.Event) -> tuple[list, bool]:
+    """
+    Wait for the first item, then collect up to max_items arriving within BATCH_WAIT_SECONDS.
+    Returns (batch, finished) where finished means the end marker was received
+    (or the pipeline is stopping).
+    """
+    batch = []
+    item = None
+    while item is None:
+        if stop.is_set():
+            return batch, True
+        try:
+            item = q.get(timeout=0.2)
+        except queue.Empty:
+            continue
+    while item is not _END:
+        batch.append(item)
+        if len(batch) >= max_items:
+            return batch, False
+        try:
+            item = q.get(timeout=BATCH_WAIT_SECONDS)
+        except queue.Empty:
+            return batch, False
+    return batch, True
+
+
+def _crawl_stage(start_date: datetime, state: CrawlState, out_q: queue.Queue,
+                 sink: _EventSink, stop: threading.Event):
+    try:
+        for article in iter_recent_articles(start_date, state, sink, cancel=stop):
+            _put(out_q, article, stop)
+            if stop.is_set():
+                break
+    except Exception as e:
+        sink.append(('error', f"Crawl stage failed: {e}"))
+    finally:
+        _put(out_q, _END, stop)
+
+
+def _summarize_stage(state: CrawlState, in_q: queue.Queue, out_q: queue.Queue, sink: _EventSink,
+                     stop: threading.Event):
+    try:
+        finished = False
+        while not finished and not stop.is_set():
+            batch, finished = _next_batch(in_q, BATCH_MAX_ARTICLES, stop)
+            if not batch:
+                continue
+            summaries = summarize_batch_with_gemini(batch, sink)
+            for article in batch:
+                if article["id"] not in summaries:
+                    # Not indexed: retried on the next crawl
+                    state.record(article["id"], STATUS_ERROR, html_hash=article["html_hash"])
+                    continue
+                _put(out_q, (article, summaries[article["id"]]), stop)
+    except Exception as e:
+        sink.append(('error', f"Summary stage failed: {e}"))
+    finally:
+        _put(out_q, _END, stop)
+
+
+def _index_batch(items: list) -> int:
+    """
+    Index a micro-batch holding the writers' lock only for this batch (not for the whole
+    crawl), on top of the latest published version of the index.
+    """
+    with index_write_lock():
+        vector_store, _ = load_vector_store()
+        return index_news(vector_store, items)
+
+
+def _index_stage(state: CrawlState, in_q: queue.Queue, sink: _EventSink,
+                 stop: threading.Event, totals: dict):
+    try:
+        finished = False
+        while not finished and not stop.is_set():
+            batch, finished = _next_batch(in_q, INDEX_MICRO_BATCH, stop)
+            if not batch:
+                continue
+            items = [to_rag_item(article, summary) for article, summary in batch]
+            totals["indexed"] += _index_batch(items)
+            for (article, _), item in zip(batch, items):
+                state.record(article["id"], STATUS_INDEXED,
+                             html_hash=article["html_hash"], published_at=article["published_at"])
+                sink.append(('indexed', item))
+            sink.append(('success', f"💾 {len(items)} articles indexed ({totals['indexed']} in this crawl)."))
+    except Exception as e:
+        sink.append(('error', f"Index stage failed: {e}"))
+    finally:
+        stop.set()
+
+
+def run_news_pipeline(start_date: datetime, state: CrawlState | None = None, add_mock: bool = True):
+    """
+    Streaming scrape -> summarize -> embed/index pipeline.
+    Each stage runs in its own thread connected by bounded queues, so articles become
+    searchable in micro-batches while crawling continues.
+
+    Yields progress events as they happen: the (type, content) message tuples
+    of the stages, plus ('indexed', rag_item) for every indexed article.
+    add_mock: index the demo MOCK item when nothing is found (disabled for scheduled crawls).
+    """
+    own_state = state is None
+    if own_state:
+        state = CrawlState()
+
+    events = queue.Queue()
+    sink = _EventSink(events)
+    stop = threading.Event()
+    extracted_q = queue.Queue(maxsize=STAGE_QUEUE_SIZE)
+    summarized_q = queue.Queue(maxsize=STAGE_QUEUE_SIZE)
+    totals = {"indexed": 0}
+
+    workers = [
+        threading.Thread(target=_crawl_stage, args=(start_date, state, extracted_q, sink, stop), daemon=True),
+        threading.Thread(target=_summarize_stage, args=(state, extracted_q, summarized_q, sink, stop), daemon=True),
+        threading.Thread(target=_index_stage, args=(state, summarized_q, sink, stop, totals), daemon=True),
+    ]
+    for worker in workers:
+        worker.start()
+
+    try:
+        # The index stage sets 'stop' when it finishes: drain the remaining events and exit
+        while not (stop.is_set() and events.empty()):
+            try:
+                yield events.get(timeout=0.2)
+            except queue.Empty:
+                continue
+    finally:
+        # Also reached if the consumer stops iterating: the stages see 'stop' and exit.
+        # Wait for all of them (source threads still write to the crawl state) before closing it
+        stop.set()
+        for worker in workers:
+            worker.join()
+        if own_state:
+            state.close()
+
+    # Late events from upstream stages that ended after the index stage
+    while not events.empty():
+        yield events.get_nowait()
+
+    # We add a MOCK if nothing is found to ensure the demo flows smoothly
+    if add_mock and totals["indexed"] == 0:
+        yield ('warning', "⚠️ No real items were found. Adding a mock item for demonstration purposes.")
+        item = mock_news_item()
+        _index_batch([item])
+        yield ('indexed', item)
@@ -1,40 +1,199 @@
 # rag.py
 
+from __future__ import annotations
+
 import streamlit as st
 import os
+import requests
+import threading
 import time
-from langchain_community.vectorstores import FAISS
-from langchain_core.documents import Document
+import uuid
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
 from llm_client import get_gemini_client, get_local_embedding_function, LLM_MODEL
 
+# LangChain/FAISS are imported on first use (see load_vector_store)
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+    from sharded_index import ShardedVectorStore
+
 FAISS_PATH = "f1_faiss_index"
 
+# Optional retrieval service (retrieval_service.py): when set, searches and ingestion go
+# through it instead of loading the model and the index in this process
+RETRIEVAL_SERVICE_URL = os.getenv("RETRIEVAL_SERVICE_URL")
+RETRIEVAL_TIMEOUT_SECONDS = 10
+
+
+INDEX_LOCK_PATH = f"{FAISS_PATH}.lock"
+INDEX_LOCK_STALE_SECONDS = 2 * 3600     # A lock whose owner cannot be checked is abandoned after this
+
+
+def _read_lock_owner() -> str | None:
+    try:
+        with open(INDEX_LOCK_PATH, encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _is_stale_lock(owner: str) -> bool:
+    """The lock owner ('<pid> <token>') is dead, or it cannot be read and the lock is very old."""
+    try:
+        return not _pid_alive(int(owner.split()[0]))
+    except (ValueError, IndexError):
+        try:
+            return time.time() - os.path.getmtime(INDEX_LOCK_PATH) > INDEX_LOCK_STALE_SECONDS
+        except FileNotFoundError:
+            return False
+
+
+_lock_holder = threading.local()   # Nesting depth of index_write_lock in the current thread
+
+
+@contextmanager
+def index_write_lock(timeout: float = 60.0):
+    """
+    Inter-process lock for FAISS writers (crawler daemon, Streamlit update pages).
+    Lock file created with O_EXCL holding '<pid> <token>'; raises TimeoutError if it cannot
+    be acquired. A lock whose process is dead is taken over, and a holder only removes
+    the lock file if it is still its own. Re-entrant within the thread that holds it.
+    """
+    depth = getattr(_lock_holder, "depth", 0)
+    if depth:
+        _lock_holder.depth = depth + 1
+        try:
+            yield
+        finally:
+            _lock_holder.depth = depth
+        return
+
+    token = f"{os.getpid()} {uuid.uuid4().hex}"
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(INDEX_LOCK_PATH, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            owner = _read_lock_owner()
+            if owner is None:
+                continue
+            if _is_stale_lock(owner) and _read_lock_owner() == owner:
+                try:
+                    os.remove(INDEX_LOCK_PATH)
+                except FileNotFoundError:
+                    pass
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"The FAISS index is locked by another writer ({INDEX_LOCK_PATH}).")
+            time.sleep(0.5)
+    try:
+        os.write(fd, token.encode())
+        os.close(fd)
+        _lock_holder.depth = 1
+        yield
+    finally:
+        _lock_holder.depth = 0
+        if _read_lock_owner() == token:
+            os.remove(INDEX_LOCK_PATH)
+
+
+_cached_store = None          # Vector store shared by every session of the process
+_cache_lock = threading.Lock()
+
+
+def load_vector_store() -> tuple[ShardedVectorStore, bool]:
+    """
+    Load the published version of the sharded FAISS index, or create an empty one if it
+    does not exist (no Streamlit calls). Returns (vector_store, created).
+    The loaded index is kept in memory for the whole process and reloaded only when
+    a new version is published (by this or another process).
+    """
+    global _cached_store
+    from sharded_index import ShardedVectorStore, current_version
 
-def get_vector_store():
-    """Initialize FAISS with the local embeddings function, loading from disk if it exists."""
     embedding_function = get_local_embedding_function()
 
+    if current_version(FAISS_PATH) is None:
+        # Nothing published yet: creating or migrating the index writes to disk, so only the
+        # lock holder does it (write lock first, then the cache lock, like every writer)
+        with index_write_lock(), _cache_lock:
+            if current_version(FAISS_PATH) is None:   # Another process may have done it meanwhile
+                if ShardedVectorStore.exists(FAISS_PATH):
+                    # Index saved in an older layout: migrated on this first load
+                    vector_store = ShardedVectorStore.load(FAISS_PATH, embedding_function)
+                    created = False
+                else:
+                    # Create an empty index (shards are created when the first news items are added)
+                    vector_store = ShardedVectorStore(embedding_function)
+                    vector_store.save_local(FAISS_PATH)
+                    created = True
+                _cached_store = vector_store
+                return vector_store, created
+
+    with _cache_lock:
+        version = current_version(FAISS_PATH)
+        if _cached_store is not None and _cached_store.version == version:
+            return _cached_store, False
+        # Load the published version
+        _cached_store = ShardedVectorStore.load(FAISS_PATH, embedding_function)
+        return _cached_store, False
+
+
+def warmup():
+    """
+    Load the embedding model and the FAISS index in a background thread, so the first
+    query does not pay for it. Safe to call several times.
+    """
+    def _warm():
+        try:
+            if RETRIEVAL_SERVICE_URL:
+                return   # The service owns the model and the index
+            load_vector_store()
+            get_local_embedding_function().embed_query("F1 warmup")
+        except Exception as e:
+            print(f"FAISS/embeddings warmup failed: {e}")
+
+    thread = threading.Thread(target=_warm, name="rag-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_vector_store():
+    """
+    Initialize FAISS with the local embeddings function, loading from disk if it exists.
+    In retrieval service mode nothing is loaded locally and None is returned.
+    """
+    if RETRIEVAL_SERVICE_URL:
+        try:
+            response = requests.get(f"{RETRIEVAL_SERVICE_URL}/health", timeout=RETRIEVAL_TIMEOUT_SECONDS)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            st.error(f"Retrieval service not available at {RETRIEVAL_SERVICE_URL}: {e}")
+            st.stop()
+        st.session_state['db_size'] = response.json()["db_size"]
+        st.info(f" Retrieval service connected: {st.session_state['db_size']} documents.")
+        return None
+
     try:
-        if os.path.exists(FAISS_PATH):
-            # Load the existing FAISS index
-            vector_store = FAISS.load_local(
-                folder_path=FAISS_PATH,
-                embeddings=embedding_function,
-                allow_dangerous_deserialization=True
-            )
-            # FAISS does not have a native .count(), we use ntotal from the underlying index
-            st.session_state['db_size'] = vector_store.index.ntotal 
-            st.info(f" Index FAISS loaded with {st.session_state['db_size']} documents.")
-        else:
-            # Create an empty FAISS index (using a placeholder document)
+        vector_store, created = load_vector_store()
+        if created:
             st.warning("Creating a new FAISS index...")
-            vector_store = FAISS.from_texts(
-                texts=["F1 AI System Initializer Placeholder"],
-                embedding=embedding_function,
-                metadatas=[{"source": "system", "driver": "none"}]
-            )
-            vector_store.save_local(FAISS_PATH)
             st.session_state['db_size'] = 0
+        else:
+            # Documents in all the shards (ntotal of each FAISS index)
+            st.session_state['db_size'] = vector_store.ntotal
+            st.info(f" Index FAISS loaded with {st.session_state['db_size']} documents.")
         return vector_store
 
     except Exception as e:
@@ -42,7 +201,59 @@ def get_vector_store():
         st.stop()
 
 
-def update_db_with_news(vector_store: FAISS, placeholder_news: list):
+def _prepare_news(news: list) -> tuple[list, list]:
+    """Texts and metadata of the news items to embed (season = publication year, used for sharding)."""
+    documents = [item["content"] for item in news]
+    metadatas = [
+        {"source": item["source"], "driver": item["driver"], "date": time.ctime(),
+         "season": int(item["published_at"][:4]) if item.get("published_at") else time.localtime().tm_year}
+        for item in news
+    ]
+    return documents, metadatas
+
+
+def build_vector_store(news: list) -> ShardedVectorStore:
+    """Build a new sharded FAISS index from scratch with the news items (used by reprocess.py)."""
+    from sharded_index import ShardedVectorStore
+
+    documents, metadatas = _prepare_news(news)
+    vector_store = ShardedVectorStore(get_local_embedding_function())
+    vector_store.add_texts(documents, metadatas)
+    return vector_store
+
+
+def replace_vector_store(vector_store: ShardedVectorStore):
+    """
+    Publish a rebuilt index as a new version of FAISS_PATH, holding the writers' lock.
+    Readers keep using the version they loaded until they reload.
+    """
+    with index_write_lock():
+        vector_store.save_local(FAISS_PATH)
+
+
+def index_news(vector_store: ShardedVectorStore, news: list) -> int:
+    """
+    Embed and add news items to FAISS and persist the index (no Streamlit calls,
+    safe to use from worker threads). Callers must hold index_write_lock and the store
+    must be the latest published version (see load_vector_store).
+    Returns the number of documents added.
+    """
+    if not news:
+        return 0
+
+    # 1. Prepare data
+    documents, metadatas = _prepare_news(news)
+
+    # 2. Add texts to their FAISS shards (only the modified shards are written)
+    vector_store.add_texts(
+        texts=documents,
+        metadatas=metadatas
+    )
+    vector_store.save_local(FAISS_PATH)   # Publishes a new index version
+    return len(documents)
+
+
+def update_db_with_news(vector_store: ShardedVectorStore | None, placeholder_news: list):
     """
     Vector Database Update Function (FAISS).
     """
@@ -50,46 +261,64 @@ def update_db_with_news(vector_store: FAISS, placeholder_news: list):
         st.warning("There is no news to update.")
         return
 
-    # 1. Prepare data
-    documents = [item["content"] for item in placeholder_news]
-    metadatas = [
-        {"source": item["source"], "driver": item["driver"], "date": time.ctime()}
-        for item in placeholder_news
-    ]
-
-    # 2. Add to FAISS DB
     try:
-        with st.spinner("Generating local embeds and indexing news..."):
-            # Add texts to FAISS index
-            vector_store.add_texts(
-                texts=documents,
-                metadatas=metadatas
-            )            
-            vector_store.save_local(FAISS_PATH)
+        if RETRIEVAL_SERVICE_URL:
+            with st.spinner("Sending news to the retrieval service..."):
+                result = _service_post("/ingest", {"news": [
+                    {"content": item["content"], "source": item["source"], "driver": item["driver"],
+                     "published_at": item.get("published_at")}
+                    for item in placeholder_news
+                ]})
+            added, st.session_state['db_size'] = result["added"], result["db_size"]
+        else:
+            with st.spinner("Generating local embeds and indexing news..."), index_write_lock():
+                # Write on top of the latest version (another session or process may have published one)
+                vector_store, _ = load_vector_store()
+                added = index_news(vector_store, placeholder_news)
+            st.session_state['db_size'] = vector_store.ntotal
 
-        st.success(f"✅ Vector Database Updated!{len(documents)} documents added.")
-        st.session_state['db_size'] = vector_store.index.ntotal
+        st.success(f"✅ Vector Database Updated!{added} documents added.")
 
     except Exception as e:
         st.error(f": Error adding documents to FAISS {e}")
 
 
-def get_rag_context(query: str, vector_store: FAISS) -> tuple[str, list[Document]]:
+def _service_post(path: str, payload: dict) -> dict:
+    response = requests.post(f"{RETRIEVAL_SERVICE_URL}{path}", json=payload, timeout=RETRIEVAL_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    return response.json()
+
+
+def _search_service(query: str, k: int) -> list[Document]:
+    """Search through the retrieval service (batched there with other users' queries)."""
+    from langchain_core.documents import Document
+
+    result = _service_post("/search", {"query": query, "k": k})
+    return [Document(page_content=doc["page_content"], metadata=doc["metadata"]) for doc in result["documents"]]
+
+
+def get_rag_context(query: str, vector_store: ShardedVectorStore | None = None) -> tuple[str, list[Document]]:
     """
-    Retrieval: Search in FAISS and format the context.
+    Retrieval: Search in FAISS (local, or in the retrieval service if RETRIEVAL_SERVICE_URL
+    is set) and format the context.
     """
-    if st.session_state.get('db_size', 0) == 0:
+    if vector_store is not None and st.session_state.get('db_size', 0) == 0:
         return "", []
 
     # 1. Retrieval 
     with st.spinner("🔍 Searching for relevant context in the Vector Database (FAISS)..."):        
-        docs = vector_store.similarity_search(query, k=3)
+        if RETRIEVAL_SERVICE_URL:
+            docs = _search_service(query, k=3)
+        else:
+            if vector_store is None:
+                vector_store, _ = load_vector_store()
+            docs = vector_store.similarity_search(query, k=3)
     # Extract and format context
     context = "\n---\n".join([doc.page_content for doc in docs])
     return context, docs
 
 
-def query_rag_system(query: str, vector_store: FAISS):
+def query_rag_system(query: str, vector_store: ShardedVectorStore | None):
     """
     Complete RAG System: Recovery with FAISS and Generation with Gemini Client.
     """
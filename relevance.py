@@ -0,0 +1,90 @@
+# relevance.py
+
+import os
+import re
+from functools import lru_cache
+from urllib.parse import urlparse
+
+from news_source_config import F1_KEYWORDS, F1_GENERIC_KEYWORDS, F1_REFERENCE_TEXTS
+
+# --- Scoring configuration ---
+TITLE_WEIGHT = 2.0              # A keyword in the title counts more than one in the URL slug
+URL_WEIGHT = 1.0
+GENERIC_WEIGHT = 0.5            # Multiplier for F1_GENERIC_KEYWORDS (never enough on their own)
+EMBEDDING_WEIGHT = 2.0          # Weight of the title/reference cosine similarity
+MIN_RELEVANCE_SCORE = 1.0       # Candidates below this score are never downloaded
+
+RELEVANCE_USE_EMBEDDINGS = os.getenv("RELEVANCE_USE_EMBEDDINGS", "false").lower() == "true"
+
+
+def _keyword_regex(keyword: str) -> str:
+    """Multi-word keywords also match URL slugs ('red bull' -> 'red-bull', 'red_bull')."""
+    return r"[\s\-_]+".join(re.escape(word) for word in keyword.split())
+
+
+# Single compiled alternation with word boundaries (longest keywords first).
+# Lookarounds instead of \b so that 'f1' does not match inside 'f1technical'.
+KEYWORD_PATTERN = re.compile(
+    r"(?<![a-z0-9])(" + "|".join(_keyword_regex(k) for k in sorted(F1_KEYWORDS, key=len, reverse=True)) + r")(?![a-z0-9])"
+)
+_SEPARATORS = re.compile(r"[\s\-_]+")
+
+
+def _keywords(text: str) -> set[str]:
+    """Distinct keywords found in the text (separators normalized to spaces)."""
+    return {_SEPARATORS.sub(" ", match) for match in KEYWORD_PATTERN.findall(text)}
+
+
+def _keyword_score(found: set[str], weight: float) -> float:
+    """Sum of the weights of the distinct keywords found in the text."""
+    return sum(weight * (GENERIC_WEIGHT if keyword in F1_GENERIC_KEYWORDS else 1.0) for keyword in found)
+
+
+def keyword_score(article_title: str, article_url: str) -> float:
+    """
+    Relevance score from the keywords in the title and in the URL path.
+    The host is ignored: it would match every link of a site like 'f1technical.net'.
+    Generic keywords alone ('Mercedes-Benz sales', 'GP of ...') score 0: they only add
+    to the score of a candidate that also matches a specific keyword.
+    """
+    title_found = _keywords(article_title.lower() if article_title else "")
+    path_found = _keywords(urlparse(article_url).path.lower() if article_url else "")
+    if not (title_found | path_found) - F1_GENERIC_KEYWORDS:
+        return 0.0
+    return _keyword_score(title_found, TITLE_WEIGHT) + _keyword_score(path_found, URL_WEIGHT)
+
+
+def _cosine(a: list[float], b: list[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = (sum(x * x for x in a) ** 0.5) * (sum(y * y for y in b) ** 0.5)
+    return dot / norm if norm else 0.0
+
+
+@lru_cache(maxsize=1)
+def _reference_vectors() -> tuple:
+    from llm_client import get_local_embedding_function
+    return tuple(get_local_embedding_function().embed_documents(F1_REFERENCE_TEXTS))
+
+
+def title_similarities(titles: list[str]) -> list[float]:
+    """Max cosine similarity of each title against the F1 reference texts (one batched embedding call)."""
+    from llm_client import get_local_embedding_function
+    references = _reference_vectors()
+    vectors = get_local_embedding_function().embed_documents([title or "" for title in titles])
+    return [max(_cosine(vector, reference) for reference in references) for vector in vectors]
+
+
+def rank_candidates(articles: list, use_embeddings: bool = RELEVANCE_USE_EMBEDDINGS) -> list[tuple[float, object]]:
+    """
+    Score newspaper candidate articles (only title and URL, before any download)
+    and return [(score, article)] sorted from most to least relevant,
+    without the candidates below MIN_RELEVANCE_SCORE.
+    """
+    scores = [keyword_score(article.title, article.url) for article in articles]
+    if use_embeddings and articles:
+        similarities = title_similarities([article.title for article in articles])
+        scores = [score + EMBEDDING_WEIGHT * similarity for score, similarity in zip(scores, similarities)]
+
+    ranked = [(score, article) for score, article in zip(scores, articles) if score >= MIN_RELEVANCE_SCORE]
+    ranked.sort(key=lambda pair: pair[0], reverse=True)
+    return ranked
@@ -0,0 +1,154 @@
+# reprocess.py
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from crawl_state import CrawlState, STATUS_DISCARDED, STATUS_TOO_OLD
+from date_extractor import ParseStats
+from html_archive import HtmlArchive, ARCHIVE_DIR
+from news_source_config import F1_SOURCE_CONFIG, UTC
+
+MIN_TEXT_LENGTH = 50
+_worker_archive = None      # One archive handle per parse process
+
+
+def _source_data(source_url: str) -> dict:
+    """Current configuration of the source (the date selector may have changed since the crawl)."""
+    config = F1_SOURCE_CONFIG.get(source_url, {"source": "Web Scraping", "driver": "F1 News", "date_selector": ""})
+    return {"url": source_url, **config}
+
+
+def _select_records(records: list[dict]) -> list[dict]:
+    """
+    Latest archived copy of each URL (a URL re-downloaded after an error keeps every copy),
+    leaving out the URLs the crawler rejected (discarded: short or duplicated text; too old).
+    """
+    latest = {}
+    for record in records:   # Oldest first: later copies replace earlier ones
+        latest[record["url"]] = record
+    state = CrawlState()
+    try:
+        return [
+            record for url, record in latest.items()
+            if (state.get(url) or {}).get("status") not in (STATUS_DISCARDED, STATUS_TOO_OLD)
+        ]
+    finally:
+        state.close()
+
+
+def _init_worker(archive_dir: str):
+    global _worker_archive
+    _worker_archive = HtmlArchive(archive_dir)
+
+
+def _parse_record(record: dict) -> tuple[dict | None, float, str | None]:
+    """
+    Parse one archived page in a worker process.
+    Returns (extracted article or None, parse seconds, date extractor that matched).
+    """
+    from scraper import parse_article_html
+
+    html = _worker_archive.get(record["hash"])
+    source_data = _source_data(record["source_url"])
+    stats = ParseStats()
+    try:
+        article, pub_date = parse_article_html(record["url"], html, source_data, [], stats)
+    except Exception:
+        return None, stats.parse_seconds, None
+    extractor = next(iter(stats.date_hits), None)
+    if not article.text or len(article.text) <= MIN_TEXT_LENGTH:
+        return None, stats.parse_seconds, extractor
+    return {
+        "id": record["url"],
+        "driver": source_data.get('driver', 'Unknown'),
+        "source": source_data.get('source', 'Web Scraping'),
+        "text": article.text,
+        "published_at": pub_date
+    }, stats.parse_seconds, extractor
+
+
+def reprocess(since: datetime | None, source_url: str | None, workers: int, llm_workers: int, dry_run: bool):
+    """
+    Re-run parsing, summarization and embedding from the archive and replace the FAISS index.
+    Only archived articles end up in the new index (manually added test news are not kept).
+    The writers' lock is held for the whole rebuild: crawler micro-batches that time out
+    waiting for it are not marked as indexed, so they are retried on the next crawl.
+    """
+    if dry_run:
+        _rebuild(since, source_url, workers, llm_workers, dry_run)
+        return
+
+    from rag import index_write_lock
+    with index_write_lock():
+        _rebuild(since, source_url, workers, llm_workers, dry_run)
+
+
+def _rebuild(since: datetime | None, source_url: str | None, workers: int, llm_workers: int, dry_run: bool):
+    from scraper import to_rag_item
+    from summarizer import summarize_batch_with_gemini, make_batches
+    from rag import build_vector_store, replace_vector_store
+
+    started = time.perf_counter()
+    archive = HtmlArchive()
+    records = archive.records(source_url)
+    archive.close()
+    selected = _select_records(records)
+    print(f"{len(selected)} articles to reprocess ({len(records)} archived pages).")
+    records = selected
+
+    # 1. Parse in parallel processes (CPU bound)
+    stats = ParseStats()
+    articles = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(ARCHIVE_DIR,)) as executor:
+        for article, parse_seconds, extractor in executor.map(_parse_record, records, chunksize=16):
+            stats.add(parse_seconds, extractor)
+            if article is None:
+                continue
+            published_at = article["published_at"]
+            if published_at and (published_at.tzinfo is None or published_at.tzinfo.utcoffset(published_at) is None):
+                published_at = UTC.localize(published_at)
+            if since and published_at and published_at < since:
+                continue
+            articles.append(article)
+    print(f"📊 {stats.summary()} {len(articles)} articles kept.")
+    if dry_run or not articles:
+        return
+
+    # 2. Summarize batches in parallel threads (I/O bound)
+    messages = []
+    summaries = {}
+    with ThreadPoolExecutor(max_workers=llm_workers) as executor:
+        for batch_summaries in executor.map(lambda batch: summarize_batch_with_gemini(batch, messages),
+                                            make_batches(articles)):
+            summaries.update(batch_summaries)
+    for msg_type, content in messages:
+        print(f"[{msg_type}] {content}")
+
+    # 3. Embed everything into a new index and swap it in
+    # Articles whose summary failed are left out of the rebuilt index
+    news = [to_rag_item(article, summaries[article["id"]]) for article in articles if article["id"] in summaries]
+    replace_vector_store(build_vector_store(news))
+    print(f"✅ FAISS index rebuilt with {len(news)} documents in {time.perf_counter() - started:.1f}s.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the FAISS index from the raw HTML archive (no downloads).")
+    parser.add_argument("--since", help="Only articles published on or after this date (YYYY-MM-DD).")
+    parser.add_argument("--source", help="Only pages of this source (listing URL from F1_SOURCE_CONFIG).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Parse processes.")
+    parser.add_argument("--llm-workers", type=int, default=4, help="Concurrent Gemini batch requests.")
+    parser.add_argument("--dry-run", action="store_true", help="Only parse and report stats; do not touch the index.")
+    args = parser.parse_args()
+
+    load_dotenv()
+    since = UTC.localize(datetime.strptime(args.since, "%Y-%m-%d")) if args.since else None
+    reprocess(since, args.source, args.workers, args.llm_workers, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# retrieval_service.py
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field
+
+from llm_client import get_local_embedding_function
+from rag import load_vector_store, index_news, index_write_lock
+
+# --- Micro-batching configuration ---
+BATCH_WINDOW_MS = float(os.getenv("RETRIEVAL_BATCH_WINDOW_MS", "5"))    # Wait for more queries after the first one
+BATCH_MAX_QUERIES = int(os.getenv("RETRIEVAL_BATCH_MAX_QUERIES", "64"))
+MAX_K = 20
+SERVICE_PORT = int(os.getenv("RETRIEVAL_SERVICE_PORT", "8001"))
+
+app = FastAPI(
+    title="F1 Retrieval Service",
+    description="Owns the embedding model and the FAISS news index. Concurrent searches are "
+                "embedded and searched together in micro-batches.",
+    version="1.0.0"
+)
+
+
+# --- Definición de Pydantic para peticiones y respuestas ---
+class SearchRequest(BaseModel):
+    query: str = Field(..., min_length=1, example="What has Hamilton said about Mercedes?")
+    k: int = Field(3, ge=1, le=MAX_K)
+
+
+class RetrievedDocument(BaseModel):
+    page_content: str
+    metadata: dict
+    score: float
+
+
+class SearchResponse(BaseModel):
+    documents: list[RetrievedDocument]
+
+
+class NewsItem(BaseModel):
+    content: str
+    source: str
+    driver: str
+    published_at: str | None = Field(None, description="ISO publication date (selects the season shard).")
+
+
+class IngestRequest(BaseModel):
+    news: list[NewsItem] = Field(..., min_length=1)
+
+
+# -------------------------------------------------------------------
+# Micro-batcher
+# -------------------------------------------------------------------
+class _MicroBatcher:
+    """
+    Collects the searches that arrive within BATCH_WINDOW_MS of each other and runs them
+    as one embedding call and one FAISS search per shard, in a single worker thread.
+    Searches run on a snapshot of the index, so ingestion never blocks them.
+    """
+
+    def __init__(self):
+        self._pending = queue.Queue()
+        self.batches = 0
+        self.queries = 0
+        self._thread = threading.Thread(target=self._run, name="retrieval-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, query: str, k: int) -> Future:
+        future = Future()
+        self._pending.put((query, k, future))
+        return future
+
+    def _collect(self) -> list:
+        """Next batch of searches; those whose caller was cancelled meanwhile are dropped."""
+        batch = []
+        while not batch:
+            self._add(batch, self._pending.get())
+        deadline = time.monotonic() + BATCH_WINDOW_MS / 1000
+        while len(batch) < BATCH_MAX_QUERIES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                self._add(batch, self._pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _add(batch: list, item: tuple):
+        # Marks the future as running, so a late cancellation can no longer invalidate it
+        if item[2].set_running_or_notify_cancel():
+            batch.append(item)
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                results = self._search([query for query, _, _ in batch], max(k for _, k, _ in batch))
+            except Exception as e:
+                for _, _, future in batch:
+                    self._deliver(future.set_exception, e)
+                continue
+            for (_, k, future), docs in zip(batch, results):
+                self._deliver(future.set_result, docs[:k])
+            self.batches += 1
+            self.queries += len(batch)
+
+    @staticmethod
+    def _deliver(setter, value):
+        # A failure delivering one result must never stop the batcher thread
+        try:
+            setter(value)
+        except Exception as e:
+            print(f"Retrieval batcher: could not deliver a result: {e}")
+
+    def _search(self, queries: list[str], k: int) -> list[list[dict]]:
+        vectors = get_local_embedding_function().embed_documents(queries)
+        vector_store, _ = load_vector_store()   # Reloaded only if a new version was published
+        hits = vector_store.search_by_vectors(vectors, k)   # One search per shard for the whole batch
+        return [
+            [{"page_content": doc.page_content, "metadata": doc.metadata, "score": score} for doc, score in row]
+            for row in hits
+        ]
+
+
+_batcher = None
+
+
+@app.on_event("startup")
+def _startup():
+    global _batcher
+    load_vector_store()                          # Load model and index before the first request
+    get_local_embedding_function().embed_query("F1 warmup")
+    _batcher = _MicroBatcher()
+
+
+# --- Endpoints ---
+@app.post("/search", response_model=SearchResponse)
+async def search(request: SearchRequest):
+    """Top-k news fragments for a query (batched with the other concurrent searches)."""
+    docs = await asyncio.wrap_future(_batcher.submit(request.query, request.k))
+    return {"documents": docs}
+
+
+@app.post("/ingest")
+def ingest(request: IngestRequest):
+    """Embed and add news items to the index (and persist it)."""
+    news = [item.model_dump() for item in request.news]
+    with index_write_lock():
+        vector_store, _ = load_vector_store()
+        added = index_news(vector_store, news)
+    return {"added": added, "db_size": vector_store.ntotal}
+
+
+@app.get("/health")
+def health():
+    try:
+        vector_store, _ = load_vector_store()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Index not available: {e}")
+    return {
+        "db_size": vector_store.ntotal,
+        "batches": _batcher.batches if _batcher else 0,
+        "queries": _batcher.queries if _batcher else 0,
+    }
+
+
+if __name__ == "__main__":
+    # Rag clients use it when RETRIEVAL_SERVICE_URL is set (e.g. http://127.0.0.1:8001)
+    print(f"Retrieval service on http://127.0.0.1:{SERVICE_PORT}/docs "
+          f"(batch window {BATCH_WINDOW_MS} ms, up to {BATCH_MAX_QUERIES} queries)")
+    uvicorn.run(app, host="0.0.0.0", port=SERVICE_PORT)
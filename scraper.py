@@ -1,146 +1,161 @@
 # scraper.py
 
-from newspaper import Article, build
+from newspaper import Article, Config, Source
+from newspaper.source import Category
 from datetime import datetime
-from llm_client import get_gemini_client, LLM_MODEL
+import queue
 import random
-from bs4 import BeautifulSoup
+from collections import namedtuple
+import time
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from fetcher import FetchScheduler, RobotsDisallowed, response_html
+from html_archive import HtmlArchive
+from date_extractor import extract_date_from_doc, ParseStats
+from relevance import keyword_score, rank_candidates, MIN_RELEVANCE_SCORE
+from crawl_state import (
+    CrawlState,
+    content_hash,
+    STATUS_TOO_OLD,
+    STATUS_DISCARDED,
+    STATUS_ERROR,
+    STATUS_LISTING
+)
 
 
 from news_source_config import (
     F1_SOURCES,
-    F1_KEYWORDS,
     USER_AGENTS,
     UTC
 )
 
 
-def extract_date_from_html(article_html: str, config: dict, messages: list) -> datetime | None:
-    """
-    Searches for date metadata using the selector and format specified in the configuration.
-    Returns a datetime 'aware' object (with timezone) or None if it fails.
-    """
-    if not article_html:
-        return None
+SOURCE_WORKERS = 4   # Sources crawled in parallel (each host keeps its own limits in the FetchScheduler)
+RESULTS_QUEUE_SIZE = 8   # Bounded: source threads wait while the consumer is busy (backpressure)
 
-    soup = BeautifulSoup(article_html, 'html.parser')
-    date_tag = None
-    date_str = None
-
-    if config["date_selector"]:
-        date_tag = soup.select_one(config["date_selector"])
-        if date_tag is None and config["date_selector"].startswith('time.'):
-            class_name = config["date_selector"].split('.')[-1]
-            date_tag = soup.find('time', class_=class_name)
-
-        if date_tag:
-            date_str = date_tag.get(config["date_attribute"])
-            date_format = config["date_format"]
-
-    # If the tag or attribute was not found, we activate failure debugging.
-    if date_tag is None or date_str is None:
-        messages.append(('info', f"🚨 DEBUG FAILURE (CSS): Date tag/attribute not found for'{config['source']}'."))
-        body_tag = soup.find('body')
-        html_excerpt = str(body_tag)[:1000] if body_tag else article_html[:1000]
-        messages.append(('code', html_excerpt))
-        return None
-
-    # If a selector was encountered, we proceed to parse with format
-    try:
-        dt_object = datetime.strptime(date_str, date_format)
-        if dt_object.tzinfo is None or dt_object.tzinfo.utcoffset(dt_object) is None:
-            return UTC.localize(dt_object)
-        else:
-            return dt_object
-    except ValueError:
-        return None
+# Candidate article of a listing page (only what the relevance ranking needs)
+ListingLink = namedtuple("ListingLink", ["url", "title"])
 
 
-# Build the newspaper font with a random User-Agent
-def build_newspaper_source(url):
+def fetch_listing_page(url: str, state: CrawlState, messages: list,
+                       scheduler: FetchScheduler) -> tuple[str | None, bool]:
     """
-    Try building and downloading the website index using a rotating user agent.
-    This helps mitigate crashes.
+    Download the index (listing) page of a source with a conditional GET.
+    Returns (html, unchanged): html is None if the page has not changed since the last crawl
+    (unchanged=True, the stored links are reused) or if the request fails (unchanged=False).
     """
-    try:        
-        user_agent = random.choice(USER_AGENTS)
-        
-        paper = build(
-            url,
-            memoize_articles=False,
-            fetch_images=False,
-            browser_user_agent=user_agent
-        )
+    # Without stored links (first crawl) the page must be parsed: plain GET
+    headers = state.conditional_headers(url) if state.listing_links(url) else {}
+    try:
+        response = scheduler.fetch(url, headers=headers)
+    except (requests.exceptions.RequestException, RobotsDisallowed) as e:
+        messages.append(('error', f"Error downloading the index page {url}: {e}"))
+        return None, False
+
+    if response.status_code == 304:
+        state.record(url, STATUS_LISTING)
+        messages.append(('info', f"Index page not modified since the last crawl (304): re-checking stored links of {url}."))
+        return None, True
+    if response.status_code != 200:
+        messages.append(('error', f"Index page {url} returned HTTP {response.status_code}."))
+        return None, False
+
+    html = response_html(response)
+    html_hash = content_hash(html)
+    previous = state.get(url)
+    state.record(
+        url, STATUS_LISTING,
+        etag=response.headers.get('ETag'),
+        last_modified=response.headers.get('Last-Modified'),
+        html_hash=html_hash
+    )
+    # Servers without ETag/Last-Modified: compare the content hash instead
+    if previous and previous["content_hash"] == html_hash and state.listing_links(url):
+        messages.append(('info', f"Index page content unchanged since the last crawl: re-checking stored links of {url}."))
+        return None, True
+    return html, False
+
+
+# Build the newspaper source from an already downloaded index page
+def build_newspaper_source(url: str, html: str):
+    """
+    Build the newspaper source from the listing page HTML (no extra downloads).
+    Memoization is disabled: the CrawlState store decides which articles are new.
+    """
+    try:
+        config = Config()
+        config.memoize_articles = False
+        config.fetch_images = False
+        config.browser_user_agent = random.choice(USER_AGENTS)
+
+        paper = Source(url, config=config)
+        category = Category(url=url)
+        category.html = html
+        paper.html = html
+        paper.categories = [category]
+        paper.parse_categories()
+        paper.generate_articles()
         return paper
     except Exception as e:
         print(f" Error building the source{url}: {e}")
         return None
 
 
-def summarize_with_gemini(text_content: str) -> str:
+def parse_article_html(url: str, html: str, source_data: dict, messages: list, stats: ParseStats):
     """
-    Use the Gemini client to summarize the text with the required restrictions.
+    Single lxml parse of an article page: body text (newspaper) and publication date (cascade).
+    Returns (article, pub_date). Shared by the crawler and the archive reprocess command.
     """
-    if not text_content:
-        return "Summary failed: Empty content."
-    
-    prompt = f"""
-    You are an expert in summarizing Formula 1 news. Your task is to summarize the following article
-    following these strict rules:
-
-    1. The summary must have a **maximum of 50 words**.
-    2. The summary must be structured in **no more than 2 paragraphs**.
-    3. Use an informative tone and write in Spanish.
-
-    FULL ARTICLE:
-    ---
-    {text_content[:1000]}
-    ---
+    article = Article(url)
+    article.download(input_html=html)
+
+    # Single lxml parse: newspaper keeps the untouched DOM in 'clean_doc',
+    # which is reused by the date cascade (the body text uses the cleaned 'doc')
+    parse_start = time.perf_counter()
+    article.parse()
+    date_extractor = None
+    if source_data.get('is_blocked'):
+        # If it's locked, we rely on newspaper's internal parser
+        pub_date = None
+    else:
+        pub_date, date_extractor = extract_date_from_doc(article.clean_doc, source_data)
+        if pub_date is None:
+            messages.append(('info', f"🚨 DEBUG FAILURE (DATE): No date extractor matched for '{source_data['source']}'."))
+            messages.append(('code', html[:1000]))
+    stats.add(time.perf_counter() - parse_start, date_extractor)
+    return article, pub_date if pub_date else article.publish_date
+
+
+def scrape_and_process_article(url: str, source_data: dict, min_date: datetime, messages: list,
+                               state: CrawlState, stats: ParseStats, html: str) -> dict | None:
     """
-
-    try:
-        client = get_gemini_client()
-        response = client.models.generate_content(
-            model=LLM_MODEL,
-            contents=[prompt]
-        ).text
-        return response
-    except Exception as e:
-        return f"Summary failed due to LLM error: {e}"
-
-
-def scrape_and_process_article(url: str, source_data: dict, min_date: datetime, messages: list) -> dict | None:
-    """
-    Scrapes a URL, extracts the text, summarizes it, and returns the data in RAG format.
-    Returns a single-item list (or empty if it fails/is old).
+    Extracts the text and date of a page already downloaded by the FetchScheduler.
+    The summary is done later, in batches.
+    Returns None if it fails, is old or is a duplicate. The outcome is recorded in the crawl state.
     """
     try:
-        user_agent = random.choice(USER_AGENTS)
-        article = Article(url, headers={'User-Agent': user_agent})
-        article.download()
-
-        # get pub_date
-        if source_data.get('is_blocked'):
-            # If it's locked, we rely on newspaper's internal parser
-            pub_date = None
-        else:
-            pub_date = extract_date_from_html(article.html, source_data, messages)
+        html_hash = content_hash(html)
+        if state.is_duplicate(url, html_hash):
+            messages.append(('info', f"Duplicated content, already indexed under another URL: {url}"))
+            state.record(url, STATUS_DISCARDED, html_hash=html_hash)
+            return None
 
-        article.parse()
+        article, final_pub_date = parse_article_html(url, html, source_data, messages, stats)
 
         # Content and Date Validation
         if not article.text or len(article.text) <= 50:
+            state.record(url, STATUS_DISCARDED, html_hash=html_hash)
             return None
-        #
-        final_pub_date = pub_date if pub_date else article.publish_date
 
-        # DATE FILTER: min_date must be an 'aware' object (we already ensured this in fetch_recent_news)
+        # DATE FILTER: min_date must be an 'aware' object (we already ensured this in iter_recent_articles)
         if final_pub_date:
             # We ensure that min_date is also 'aware' if the user passes it without TZ
             if min_date.tzinfo is None or min_date.tzinfo.utcoffset(min_date) is None:
                 min_date = UTC.localize(min_date)
 
             if final_pub_date < min_date:
+                state.record(url, STATUS_TOO_OLD, html_hash=html_hash, published_at=final_pub_date)
                 messages.append(('info', f"Discarding article due to age -> : '{source_data['source']}' - {url} (Date: {final_pub_date.strftime('%Y-%m-%d')})"))
                 return None
         else:
@@ -149,89 +164,184 @@ def scrape_and_process_article(url: str, source_data: dict, min_date: datetime,
             else:
                 messages.append(('warning', f" The date could not be extracted for {url} of {source_data['source']}"))
         
-        summary = summarize_with_gemini(article.text)
-        
         return {
+            "id": url,
             "driver": source_data.get('driver', 'Unknown'),
             "source": source_data.get('source', 'Web Scraping'),
-            "content": summary
+            "text": article.text,
+            "html_hash": html_hash,
+            "published_at": final_pub_date
         }
 
     except Exception as e:
+        state.record(url, STATUS_ERROR)
         messages.append(('error', f"Error processing URL {url}: {e}"))
         return None
 
 
 def is_f1_relevant(article_title: str, article_url: str) -> bool:
     """
-    Check if the title or URL contains F1 keywords.
+    Check if the title or URL path contains F1 keywords (word-boundary match).
     """
-    title_lower = article_title.lower() if article_title else ""
-    url_lower = article_url.lower() if article_url else ""
-    
-    for keyword in F1_KEYWORDS:
-        if keyword in title_lower or keyword in url_lower:
-            return True
-    return False
+    return keyword_score(article_title, article_url) >= MIN_RELEVANCE_SCORE
 
 
-def fetch_recent_news(start_date: datetime = datetime.today()) -> tuple[list, list]:
+def _crawl_source(source_data: dict, start_date: datetime, state: CrawlState, scheduler: FetchScheduler,
+                  archive: HtmlArchive, stats: ParseStats, messages: list, skipped: list, emit,
+                  stop: threading.Event):
     """
-    It searches for recent articles from predefined sources and processes them.
+    Crawl one source: listing page, relevance ranking and article downloads in waves
+    (as many in parallel as the host allows, never more than the remaining budget).
+    Every downloaded page is archived; every extracted article is passed to emit().
+    Gives up between downloads once 'stop' is set.
     """
     PAPER_ARTICLES_LIMIT = 100
     F1_PAPER_ARTICLES_LIMIT = 2
     f1_papers = 0
-    processed_articles = []
-    messages = []
-
-    # We ensure that the start date is 'aware' (with TZ) for comparison
-    if start_date.tzinfo is None or start_date.tzinfo.utcoffset(start_date) is None:
-        start_date = UTC.localize(start_date)
+    source_url = source_data['url']
+    messages.append(('info', f"🕸️ : **{source_data['source']}**"))
 
-    for source_data in F1_SOURCES:
-        source_url = source_data['url']
-        messages.append(('info', f"🕸️ : **{source_data['source']}**"))
-
-        try:
-            # Build the index (download the main page and look for links to articles)
-            paper = build_newspaper_source(source_url)
+    try:
+        # Download the main page (conditional GET) and look for links to articles.
+        # If it has not changed, only the listing parse is skipped: the links stored in the
+        # last crawl are processed again (pending ones past the budget, errors, too old ones
+        # that an earlier start date makes valid again)
+        listing_html, unchanged = fetch_listing_page(source_url, state, messages, scheduler)
+        if unchanged:
+            links = [ListingLink(url, title) for url, title in state.listing_links(source_url)]
+        elif listing_html is None:
+            return
+        else:
+            paper = build_newspaper_source(source_url, listing_html)
             if paper is None:
                 messages.append(('error', f"❌ Connection failure or lock for {source_url}. Skipping source."))
-                continue
-
+                return
             messages.append(('info', f"Potential articles found : {len(paper.articles)}"))
-            
-            # We limit it to the first X articles to avoid overload and costly/slow calls
-            for article in paper.articles[:PAPER_ARTICLES_LIMIT]:
-                if not is_f1_relevant(article.title, article.url):
+            links = [ListingLink(article.url, article.title or "") for article in paper.articles[:PAPER_ARTICLES_LIMIT]]
+            state.save_listing_links(source_url, links)
+
+        # Rank the first X candidates by title/URL relevance before downloading anything,
+        # so the download budget goes to the best ones
+        candidates = []
+        for link in links:
+            if state.should_skip(link.url, start_date):
+                skipped.append(link.url)
+            else:
+                candidates.append(link)
+        ranked = [article for score, article in rank_candidates(candidates)]
+        messages.append(('info', f"Relevant candidates: {len(ranked)} of {len(candidates)} new links."))
+
+        while ranked and f1_papers < F1_PAPER_ARTICLES_LIMIT and not stop.is_set():
+            wave, ranked = ranked[:F1_PAPER_ARTICLES_LIMIT - f1_papers], ranked[F1_PAPER_ARTICLES_LIMIT - f1_papers:]
+            for url, response in scheduler.fetch_many([article.url for article in wave]):
+                if stop.is_set():
+                    return
+                if isinstance(response, Exception) or response.status_code != 200:
+                    error = response if isinstance(response, Exception) else f"HTTP {response.status_code}"
+                    state.record(url, STATUS_ERROR)
+                    messages.append(('error', f"Error downloading URL {url}: {error}"))
                     continue
-
-                # Process, summarize, and index if relevant.
+                # Keep the raw HTML so the index can be rebuilt without re-downloading (reprocess.py)
+                html = response_html(response)
+                archive.put(url, html, source_url)
+                # Extract in relevance order (the summary is done in batches downstream).
                 # We pass the message list to the scraper to centralize the reports.
-                result = scrape_and_process_article(article.url, source_data, start_date, messages)
+                result = scrape_and_process_article(url, source_data, start_date, messages, state, stats,
+                                                    html=html)
                 if result:
-                    processed_articles.append(result)
-                    
+                    emit(result)
                     f1_papers += 1
-                    if f1_papers >= F1_PAPER_ARTICLES_LIMIT:
-                        messages.append(('info', f"Límit of {F1_PAPER_ARTICLES_LIMIT} articles reached."))
-                        break
-
-        except Exception as e:
-            messages.append(('error', f"Failure during article iteration {source_url}. Error: {e}"))
-
-    # We add a MOCK if nothing is found to ensure the demo flows smoothly
-    if not processed_articles:
-        messages.append(('warning', "⚠️ No real items were found. Adding a mock item for demonstration purposes."))
-        summary = """Formula 1 is planning a radical change in aerodynamics for 2026,
-        seeking lighter cars with less drag, focusing on sustainability and closer racing.
-        This change promises to reshape the balance of power between the teams.
-        """
-        processed_articles.append({
-            "driver": "Rules for 2026",
-            "source": "F1 Mock Data",
-            "content": summary
-        })
-
-    return processed_articles, messages
+
+        if f1_papers >= F1_PAPER_ARTICLES_LIMIT:
+            messages.append(('info', f"Límit of {F1_PAPER_ARTICLES_LIMIT} articles reached."))
+
+    except Exception as e:
+        messages.append(('error', f"Failure during article iteration {source_url}. Error: {e}"))
+
+
+def iter_recent_articles(start_date: datetime, state: CrawlState, messages: list,
+                         archive: HtmlArchive | None = None, cancel: threading.Event | None = None):
+    """
+    Generator version of the crawl: yields each extracted article (not summarized yet)
+    as soon as it is downloaded, so the next stages can work while crawling continues.
+    Sources are crawled in parallel; a shared FetchScheduler keeps every host within its limits.
+    cancel: optional event that ends the crawl early (like closing the generator).
+    When the generator ends, every source thread has exited.
+    """
+    skipped = []
+    stats = ParseStats()
+    results = queue.Queue(maxsize=RESULTS_QUEUE_SIZE)
+    done = object()
+    stop = threading.Event()   # Set when the consumer stops iterating
+
+    # We ensure that the start date is 'aware' (with TZ) for comparison
+    if start_date.tzinfo is None or start_date.tzinfo.utcoffset(start_date) is None:
+        start_date = UTC.localize(start_date)
+
+    scheduler = FetchScheduler()
+    own_archive = archive is None
+    if own_archive:
+        archive = HtmlArchive()
+
+    def _emit(item):
+        """Blocking put that gives up if the consumer is gone (the item is dropped)."""
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.2)
+                return
+            except queue.Full:
+                continue
+
+    def _run_all():
+        with ThreadPoolExecutor(max_workers=SOURCE_WORKERS, thread_name_prefix="source") as executor:
+            for source_data in F1_SOURCES:
+                executor.submit(_crawl_source, source_data, start_date, state, scheduler,
+                                archive, stats, messages, skipped, _emit, stop)
+        _emit(done)
+
+    runner = threading.Thread(target=_run_all, daemon=True)
+    runner.start()
+    try:
+        while not (cancel is not None and cancel.is_set()):
+            try:
+                item = results.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if item is done:
+                break
+            yield item
+    finally:
+        stop.set()
+        runner.join()
+        scheduler.close()
+        if own_archive:
+            archive.close()
+
+    messages.append(('info', f"📊 {stats.summary()}"))
+    if skipped:
+        messages.append(('info', f"{len(skipped)} articles already processed in previous crawls were skipped."))
+
+
+def to_rag_item(article: dict, summary: str) -> dict:
+    """Build the RAG format item (driver, source, content) of an extracted article."""
+    published_at = article.get("published_at")
+    return {
+        "driver": article["driver"],
+        "source": article["source"],
+        "content": summary,
+        "published_at": published_at.isoformat() if published_at else None
+    }
+
+
+def mock_news_item() -> dict:
+    """MOCK item used when nothing is found, to ensure the demo flows smoothly."""
+    summary = """Formula 1 is planning a radical change in aerodynamics for 2026,
+    seeking lighter cars with less drag, focusing on sustainability and closer racing.
+    This change promises to reshape the balance of power between the teams.
+    """
+    return {
+        "driver": "Rules for 2026",
+        "source": "F1 Mock Data",
+        "content": summary
+    }
+
@@ -0,0 +1,422 @@
+# sharded_index.py
+
+import heapq
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+# --- Sharding configuration ---
+SHARD_BY = os.getenv("INDEX_SHARD_BY", "source")       # source | season | hash (only for new indexes)
+HASH_SHARDS = int(os.getenv("INDEX_HASH_SHARDS", "4"))
+SEARCH_WORKERS = int(os.getenv("INDEX_SEARCH_WORKERS", str(min(8, os.cpu_count() or 1))))
+SHARD_STRATEGIES = ("source", "season", "hash")
+
+MANIFEST_NAME = "manifest.json"         # Unversioned manifest of the first sharded layout (migrated on load)
+CURRENT_NAME = "CURRENT"                # Pointer to the published version, replaced atomically
+VERSIONS_DIR = "versions"
+SHARDS_DIR = "shards"
+KEEP_VERSIONS = int(os.getenv("INDEX_KEEP_VERSIONS", "3"))
+VERSION_MIN_AGE_SECONDS = 120           # Grace time after a version stops being CURRENT (readers may be loading it)
+
+_search_pool = None
+_search_pool_lock = threading.Lock()
+
+
+def _get_search_pool() -> ThreadPoolExecutor:
+    """Shared pool for the shard fan-out (FAISS releases the GIL while searching)."""
+    global _search_pool
+    if _search_pool is None:
+        with _search_pool_lock:
+            if _search_pool is None:
+                _search_pool = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="shard-search")
+    return _search_pool
+
+
+def shard_key(content: str, metadata: dict, shard_by: str) -> str:
+    """Name of the shard a document belongs to (also used in its directory name)."""
+    if shard_by == "season":
+        return str(metadata.get("season") or datetime.now().year)
+    if shard_by == "hash":
+        return f"h{zlib.crc32(content.encode('utf-8')) % HASH_SHARDS:02d}"
+    return re.sub(r"[^a-z0-9]+", "-", str(metadata.get("source", "")).lower()).strip("-") or "unknown"
+
+
+def _shard_documents(store) -> list:
+    """Documents of a FAISS store in index order."""
+    return [store.docstore.search(store.index_to_docstore_id[i]) for i in range(store.index.ntotal)]
+
+
+def _copy_store(store):
+    """Independent copy of a FAISS store, so it can be modified while searches use the original."""
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+
+    index_to_docstore_id = dict(store.index_to_docstore_id)
+    docstore = InMemoryDocstore({doc_id: store.docstore.search(doc_id) for doc_id in index_to_docstore_id.values()})
+    return FAISS(store.embedding_function, faiss.clone_index(store.index), docstore, index_to_docstore_id)
+
+
+def _version_name(version: int) -> str:
+    return f"v{version:06d}"
+
+
+def _write_atomic(path: str, content: str):
+    """Write to a temporary file and rename it over the target (readers see old or new, never half)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def current_version(path: str) -> int | None:
+    """Published version of the index in path (None if nothing has been published)."""
+    try:
+        with open(os.path.join(path, CURRENT_NAME), encoding="utf-8") as f:
+            return int(f.read().strip().lstrip("v"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def list_versions(path: str) -> list[int]:
+    versions_dir = os.path.join(path, VERSIONS_DIR)
+    if not os.path.isdir(versions_dir):
+        return []
+    return sorted(int(name[1:-5]) for name in os.listdir(versions_dir) if re.fullmatch(r"v\d+\.json", name))
+
+
+def _read_manifest(path: str, version: int) -> dict:
+    with open(os.path.join(path, VERSIONS_DIR, f"{_version_name(version)}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _collect_garbage(path: str):
+    """
+    Delete old versions and the shard directories no kept version uses. The last
+    KEEP_VERSIONS are always kept, and so is any version superseded (i.e. its successor
+    published) less than VERSION_MIN_AGE_SECONDS ago, since a reader may still be loading it.
+    Only called by the writer holding the index lock.
+    """
+    versions = list_versions(path)
+    now = time.time()
+    kept = set(versions[-KEEP_VERSIONS:])
+    for version, successor in zip(versions, versions[1:]):
+        if version in kept:
+            continue
+        successor_path = os.path.join(path, VERSIONS_DIR, f"{_version_name(successor)}.json")
+        if now - os.path.getmtime(successor_path) > VERSION_MIN_AGE_SECONDS:
+            os.remove(os.path.join(path, VERSIONS_DIR, f"{_version_name(version)}.json"))
+        else:
+            kept.add(version)
+
+    used = {os.path.basename(shard["dir"]) for version in kept for shard in _read_manifest(path, version)["shards"].values()}
+    shards_dir = os.path.join(path, SHARDS_DIR)
+    for name in os.listdir(shards_dir) if os.path.isdir(shards_dir) else []:
+        if name not in used:
+            shutil.rmtree(os.path.join(shards_dir, name), ignore_errors=True)
+
+
+class StaleIndexError(RuntimeError):
+    """The index on disk has a newer version than the one this store was loaded from."""
+
+
+class ShardedVectorStore:
+    """
+    News vector store split into independent FAISS shards (by source, season or hash).
+    Searches embed the query once, fan out over the shards in a thread pool and merge
+    the per-shard results into a global top-k (lowest L2 distance first).
+
+    Shards are never modified once published: writers copy the shards they change and
+    swap in a new shard map, so every search runs on one consistent snapshot without
+    locks. On disk, each save is a new immutable version (versions/vNNNNNN.json listing
+    its shard directories) published by atomically replacing the CURRENT pointer.
+    """
+
+    def __init__(self, embedding, shard_by: str = SHARD_BY):
+        if shard_by not in SHARD_STRATEGIES:
+            raise ValueError(f"Unknown shard strategy '{shard_by}'. Options: {', '.join(SHARD_STRATEGIES)}")
+        self.embedding = embedding
+        self.shard_by = shard_by
+        self.version = None             # Published version loaded or last saved (None: never saved)
+        self._shards = {}               # name -> FAISS store (snapshot: replaced as a whole, never mutated)
+        self._shard_dirs = {}           # name -> saved directory; missing = shard not saved yet
+        self._lock = threading.Lock()   # In-process writers
+
+    # --- Info ---
+    @property
+    def ntotal(self) -> int:
+        return sum(store.index.ntotal for store in self._shards.values())
+
+    def shard_sizes(self) -> dict[str, int]:
+        return {name: store.index.ntotal for name, store in sorted(self._shards.items())}
+
+    # --- Shard management ---
+    def _publish(self, changed: dict, dropped: tuple = ()):
+        """Swap in a new shard map with the changed shards (caller holds self._lock)."""
+        self._shards = {name: store for name, store in {**self._shards, **changed}.items() if name not in dropped}
+        self._shard_dirs = {name: d for name, d in self._shard_dirs.items() if name not in changed and name not in dropped}
+
+    def add_shard(self, name: str, store):
+        """Publish a FAISS store as a shard (replaces a shard with the same name)."""
+        with self._lock:
+            self._publish({name: store})
+
+    def drop_shard(self, name: str):
+        with self._lock:
+            if name not in self._shards:
+                raise KeyError(f"Shard '{name}' does not exist.")
+            self._publish({}, dropped=(name,))
+
+    def rebuild_shard(self, name: str):
+        """
+        Re-embed the documents of a shard (e.g. after changing the embedding backend) into
+        a new FAISS index and swap it in. Searches keep using the old one meanwhile.
+        """
+        from langchain_community.vectorstores import FAISS
+
+        documents = _shard_documents(self._shards[name])
+        store = FAISS.from_texts(
+            texts=[doc.page_content for doc in documents],
+            embedding=self.embedding,
+            metadatas=[doc.metadata for doc in documents]
+        )
+        self.add_shard(name, store)
+
+    # --- Writes ---
+    def add_texts(self, texts: list[str], metadatas: list[dict]) -> int:
+        """Embed the texts once and add each one to its shard (new shards are created on demand)."""
+        return self.add_embeddings(texts, self.embedding.embed_documents(texts), metadatas)
+
+    def add_embeddings(self, texts: list[str], vectors: list, metadatas: list[dict]) -> int:
+        """
+        Add already embedded texts, grouped by shard. The affected shards are copied, so
+        searches running meanwhile never see a partially added batch.
+        """
+        from langchain_community.vectorstores import FAISS
+
+        groups = {}
+        for text, vector, metadata in zip(texts, vectors, metadatas):
+            groups.setdefault(shard_key(text, metadata, self.shard_by), []).append((text, list(vector), metadata))
+
+        with self._lock:
+            changed = {}
+            for name, items in groups.items():
+                text_embeddings = [(text, vector) for text, vector, _ in items]
+                item_metadatas = [metadata for _, _, metadata in items]
+                if name in self._shards:
+                    store = _copy_store(self._shards[name])
+                    store.add_embeddings(text_embeddings, metadatas=item_metadatas)
+                else:
+                    store = FAISS.from_embeddings(text_embeddings, self.embedding, metadatas=item_metadatas)
+                changed[name] = store
+            self._publish(changed)
+        return len(texts)
+
+    def export(self) -> tuple[list, list, list]:
+        """(texts, vectors, metadatas) of every document, to re-shard without re-embedding."""
+        texts, vectors, metadatas = [], [], []
+        for store in self._shards.values():
+            documents = _shard_documents(store)
+            texts.extend(doc.page_content for doc in documents)
+            vectors.extend(store.index.reconstruct_n(0, store.index.ntotal))
+            metadatas.extend(doc.metadata for doc in documents)
+        return texts, vectors, metadatas
+
+    # --- Reads ---
+    @staticmethod
+    def _search_shard(store, vectors: np.ndarray, k: int) -> list[list[tuple]]:
+        scores, ids = store.index.search(vectors, min(k, store.index.ntotal))
+        return [
+            [(store.docstore.search(store.index_to_docstore_id[index_id]), float(score))
+             for score, index_id in zip(row_scores, row_ids) if index_id != -1]
+            for row_scores, row_ids in zip(scores, ids)
+        ]
+
+    def search_by_vectors(self, vectors, k: int = 4) -> list[list[tuple]]:
+        """
+        Top-k (document, L2 distance) for each query vector, merged over all shards
+        of the current snapshot.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        shards = [store for store in self._shards.values() if store.index.ntotal]
+        if not shards:
+            return [[] for _ in range(len(vectors))]
+        if len(shards) == 1:
+            per_shard = [self._search_shard(shards[0], vectors, k)]
+        else:
+            pool = _get_search_pool()
+            per_shard = list(pool.map(lambda store: self._search_shard(store, vectors, k), shards))
+        return [
+            heapq.nsmallest(k, (hit for shard_hits in per_shard for hit in shard_hits[row]), key=lambda hit: hit[1])
+            for row in range(len(vectors))
+        ]
+
+    def similarity_search_with_score(self, query: str, k: int = 4) -> list[tuple]:
+        return self.search_by_vectors([self.embedding.embed_query(query)], k)[0]
+
+    def similarity_search(self, query: str, k: int = 4) -> list:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    # --- Persistence ---
+    def save_local(self, path: str) -> int:
+        """
+        Publish the store as a new version: new/modified shards go to new directories
+        (written under a temporary name and renamed), unchanged ones are reused, and the
+        CURRENT pointer is replaced last. Callers must hold rag.index_write_lock.
+        Raises StaleIndexError if another writer published a version after this store was loaded
+        (a store that was never saved, e.g. a full rebuild, replaces whatever is published).
+        Returns the new version.
+        """
+        os.makedirs(os.path.join(path, SHARDS_DIR), exist_ok=True)
+        os.makedirs(os.path.join(path, VERSIONS_DIR), exist_ok=True)
+        with self._lock:
+            published = current_version(path)
+            if self.version is not None and published != self.version:
+                raise StaleIndexError(f"Index version {published} was published after version {self.version} "
+                                      "was loaded; reload it before writing.")
+            version = max([published or 0] + list_versions(path)) + 1
+
+            shard_dirs = dict(self._shard_dirs)
+            for name, store in self._shards.items():
+                if name in shard_dirs:
+                    continue
+                shard_dir = os.path.join(SHARDS_DIR, f"{name}-{_version_name(version)}")
+                final_path = os.path.join(path, shard_dir)
+                tmp_path = f"{final_path}.tmp"
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                shutil.rmtree(final_path, ignore_errors=True)   # Leftover of a write that was never published
+                store.save_local(tmp_path)
+                os.rename(tmp_path, final_path)
+                shard_dirs[name] = shard_dir
+
+            manifest = {
+                "version": version,
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "shard_by": self.shard_by,
+                "shards": {name: {"dir": shard_dirs[name], "documents": store.index.ntotal}
+                           for name, store in sorted(self._shards.items())},
+            }
+            _write_atomic(os.path.join(path, VERSIONS_DIR, f"{_version_name(version)}.json"),
+                          json.dumps(manifest, indent=2))
+            _write_atomic(os.path.join(path, CURRENT_NAME), _version_name(version))   # Publish
+            self._shard_dirs = shard_dirs
+            self.version = version
+
+        _collect_garbage(path)
+        return version
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        """A published index, or one saved in an older layout, is in path."""
+        return any(os.path.exists(os.path.join(path, name)) for name in (CURRENT_NAME, MANIFEST_NAME, "index.faiss"))
+
+    @classmethod
+    def load(cls, path: str, embedding, version: int | None = None) -> "ShardedVectorStore":
+        """Load the published version (or a specific, still kept, version) of the index."""
+        from langchain_community.vectorstores import FAISS
+
+        if version is None:
+            version = current_version(path)
+        if version is None:
+            return cls._migrate(path, embedding)
+
+        manifest = _read_manifest(path, version)
+        vector_store = cls(embedding, shard_by=manifest["shard_by"])
+        for name, shard in manifest["shards"].items():
+            vector_store._shards[name] = FAISS.load_local(
+                folder_path=os.path.join(path, shard["dir"]),
+                embeddings=embedding,
+                allow_dangerous_deserialization=True
+            )
+            vector_store._shard_dirs[name] = shard["dir"]
+        vector_store.version = version
+        return vector_store
+
+    @classmethod
+    def _migrate(cls, path: str, embedding) -> "ShardedVectorStore":
+        """
+        Publish the first version of an index saved in an older layout:
+        - unversioned shards (manifest.json + shards/<name>/): their directories are reused as they are.
+        - single-file index (index.faiss/index.pkl): split into shards reusing its vectors
+          (nothing is re-embedded). The placeholder document is dropped.
+        """
+        from langchain_community.vectorstores import FAISS
+
+        manifest_path = os.path.join(path, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            vector_store = cls(embedding, shard_by=manifest["shard_by"])
+            for name in manifest["shards"]:
+                shard_dir = os.path.join(SHARDS_DIR, name)
+                vector_store._shards[name] = FAISS.load_local(
+                    folder_path=os.path.join(path, shard_dir), embeddings=embedding,
+                    allow_dangerous_deserialization=True
+                )
+                vector_store._shard_dirs[name] = shard_dir
+            vector_store.save_local(path)
+            os.remove(manifest_path)
+            return vector_store
+
+        legacy = FAISS.load_local(folder_path=path, embeddings=embedding, allow_dangerous_deserialization=True)
+        vectors = legacy.index.reconstruct_n(0, legacy.index.ntotal)
+        kept = [(doc, vector) for doc, vector in zip(_shard_documents(legacy), vectors)
+                if doc.metadata.get("source") != "system"]
+        vector_store = cls(embedding)
+        vector_store.add_embeddings(
+            [doc.page_content for doc, _ in kept], [vector for _, vector in kept], [doc.metadata for doc, _ in kept]
+        )
+        vector_store.save_local(path)
+        for legacy_file in ("index.faiss", "index.pkl"):
+            os.remove(os.path.join(path, legacy_file))
+        return vector_store
+
+
+def main():
+    # python sharded_index.py list | drop <shard> | rebuild <shard> | reshard <source|season|hash>
+    from llm_client import get_local_embedding_function
+    from rag import FAISS_PATH, load_vector_store, replace_vector_store, index_write_lock
+
+    command, args = (sys.argv[1], sys.argv[2:]) if len(sys.argv) > 1 else ("list", [])
+    vector_store, _ = load_vector_store()
+
+    if command == "list":
+        print(f"{FAISS_PATH}: version {vector_store.version} (kept: {list_versions(FAISS_PATH)}), "
+              f"sharded by {vector_store.shard_by}, {vector_store.ntotal} documents")
+        for name, size in vector_store.shard_sizes().items():
+            print(f"    {name:<30} {size:6d}")
+    elif command in ("drop", "rebuild"):
+        with index_write_lock():
+            vector_store, _ = load_vector_store()
+            for name in args:
+                if command == "drop":
+                    vector_store.drop_shard(name)
+                else:
+                    vector_store.rebuild_shard(name)
+                print(f"Shard '{name}': {command} done.")
+            vector_store.save_local(FAISS_PATH)
+    elif command == "reshard":
+        # Export and publish under the same lock, so no version published in between is lost
+        with index_write_lock():
+            vector_store, _ = load_vector_store()
+            resharded = ShardedVectorStore(get_local_embedding_function(), shard_by=args[0])
+            resharded.add_embeddings(*vector_store.export())
+            replace_vector_store(resharded)
+        print(f"Index resharded by {args[0]}: {resharded.shard_sizes()}")
+    else:
+        print(f"Unknown command '{command}'. Use: list, drop, rebuild, reshard.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# summarizer.py
+
+import json
+from llm_client import get_gemini_client, LLM_MODEL
+
+# --- Batching configuration ---
+ARTICLE_CHAR_LIMIT = 1000           # Same truncation used by the single-article prompt
+CHARS_PER_TOKEN = 4                 # Rough estimate for Latin-script text
+BATCH_INPUT_TOKEN_BUDGET = 2500     # Input tokens per batch request (~10 full-length articles)
+BATCH_MAX_ARTICLES = 15             # Keeps the JSON output well below the model's output limit
+SUMMARY_MAX_WORDS = 70              # Validation tolerance over the 50-word rule of the prompt
+
+SUMMARY_RULES = """
+    1. The summary must have a **maximum of 50 words**.
+    2. The summary must be structured in **no more than 2 paragraphs**.
+    3. Use an informative tone and write in Spanish.
+"""
+
+BATCH_RESPONSE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "id": {"type": "STRING"},
+            "summary": {"type": "STRING"}
+        },
+        "required": ["id", "summary"]
+    }
+}
+
+
+def _summarize_request(text_content: str) -> str:
+    """One Gemini request for a single article (batch fallback). Raises on empty content or LLM errors."""
+    if not text_content:
+        raise ValueError("Empty content.")
+
+    prompt = f"""
+    You are an expert in summarizing Formula 1 news. Your task is to summarize the following article
+    following these strict rules:
+{SUMMARY_RULES}
+    FULL ARTICLE:
+    ---
+    {text_content[:ARTICLE_CHAR_LIMIT]}
+    ---
+    """
+
+    client = get_gemini_client()
+    return client.models.generate_content(
+        model=LLM_MODEL,
+        contents=[prompt]
+    ).text
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def make_batches(articles: list[dict], token_budget: int = BATCH_INPUT_TOKEN_BUDGET,
+                 max_articles: int = BATCH_MAX_ARTICLES) -> list[list[dict]]:
+    """
+    Group articles ({'id', 'text'}) into batches that respect the token budget
+    and the maximum number of articles per request.
+    """
+    batches = []
+    current, current_tokens = [], 0
+    for article in articles:
+        tokens = _estimate_tokens(article["text"][:ARTICLE_CHAR_LIMIT])
+        if current and (current_tokens + tokens > token_budget or len(current) >= max_articles):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(article)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _is_valid_summary(summary) -> bool:
+    return isinstance(summary, str) and summary.strip() != "" and len(summary.split()) <= SUMMARY_MAX_WORDS
+
+
+def _summarize_batch_request(batch: list[dict]) -> dict[str, str]:
+    """
+    One Gemini request for the whole batch, with structured JSON output.
+    Returns {article_id: summary} only for the items that pass validation.
+    """
+    from google import genai
+
+    articles_block = "\n".join(
+        f'ARTICLE id="{article["id"]}":\n---\n{article["text"][:ARTICLE_CHAR_LIMIT]}\n---'
+        for article in batch
+    )
+    prompt = f"""
+    You are an expert in summarizing Formula 1 news. Summarize EACH of the following articles
+    independently, following these strict rules for every summary:
+{SUMMARY_RULES}
+    Return one JSON object per article with its exact "id" and its "summary".
+
+    ARTICLES:
+    {articles_block}
+    """
+
+    client = get_gemini_client()
+    response = client.models.generate_content(
+        model=LLM_MODEL,
+        contents=[prompt],
+        config=genai.types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=BATCH_RESPONSE_SCHEMA
+        )
+    )
+    expected_ids = {article["id"] for article in batch}
+    summaries = {}
+    for item in json.loads(response.text):
+        if not isinstance(item, dict):
+            continue
+        article_id = str(item.get("id"))
+        if article_id in expected_ids and _is_valid_summary(item.get("summary")):
+            summaries[article_id] = item["summary"].strip()
+    return summaries
+
+
+def summarize_batch_with_gemini(articles: list[dict], messages: list) -> dict[str, str]:
+    """
+    Summarize many articles ({'id', 'text'}) packing several of them per Gemini request.
+    Items missing or invalid in the batch response fall back to a per-article call.
+    Returns {article_id: summary}; articles whose summary failed are left out
+    (callers must not index them, so they are retried on the next crawl).
+    """
+    summaries = {}
+    batches = make_batches(articles)
+    fallback = []
+
+    for batch in batches:
+        try:
+            batch_summaries = _summarize_batch_request(batch)
+        except Exception as e:
+            messages.append(('warning', f"Batch summary failed ({len(batch)} articles), retrying one by one: {e}"))
+            batch_summaries = {}
+        summaries.update(batch_summaries)
+        fallback.extend(article for article in batch if article["id"] not in batch_summaries)
+
+    failed = 0
+    for article in fallback:
+        try:
+            summaries[article["id"]] = _summarize_request(article["text"])
+        except Exception as e:
+            failed += 1
+            messages.append(('warning', f"Summary failed for {article['id']}: {e}"))
+
+    messages.append((
+        'info',
+        f"🤖 {len(articles)} articles summarized with {len(batches) + len(fallback)} LLM requests "
+        f"({len(batches)} batches, {len(fallback)} individual fallbacks, {failed} failed)."
+    ))
+    return summaries